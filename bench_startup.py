@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Startup budget for gc_vgamepad.py, the bridge is relaunched on every session so its startup is user-visible.
+Imports the module under python -X importtime and times --help, fails when either goes over budget
+or when a heavy dependency (bleak, vgamepad, pyusb, shared memory) gets imported before a controller needs it.
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+# Only imported once a controller connects or the matching option is used
+DEFERRED_MODULES = ("bleak", "vgamepad", "usb", "pyudev", "multiprocessing.shared_memory")
+
+def measure_imports(module):
+    """Returns (cumulative import time of module in us, {module name: cumulative us}) from -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    imports = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports[name.strip()] = int(cumulative)
+    return imports[module], imports
+
+def measure_help(script, runs):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, script, "--help"], cwd=REPO_DIR, capture_output=True, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the startup time budget of gc_vgamepad.py')
+    parser.add_argument('--import-budget-ms', type=float, default=150.0, help='Budget for import gc_vgamepad (default: 150)')
+    parser.add_argument('--help-budget-ms', type=float, default=400.0, help='Budget for a full gc_vgamepad.py --help run, interpreter included (default: 400)')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per measurement, the best one counts (default: 5)')
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports to list (default: 10)')
+    args = parser.parse_args()
+
+    failures = []
+    import_us, imports = min((measure_imports("gc_vgamepad") for _ in range(args.runs)), key=lambda result: result[0])
+    print(f"import gc_vgamepad: {import_us / 1000:.1f} ms (budget {args.import_budget_ms:.0f} ms)")
+    for name, cumulative in sorted(imports.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"   {cumulative / 1000:7.1f} ms  {name}")
+    if import_us / 1000 > args.import_budget_ms:
+        failures.append("import gc_vgamepad is over budget")
+    for name in DEFERRED_MODULES:
+        if name in imports:
+            failures.append(f"{name} is imported at startup")
+
+    help_s = measure_help("gc_vgamepad.py", args.runs)
+    print(f"gc_vgamepad.py --help: {help_s * 1000:.1f} ms (budget {args.help_budget_ms:.0f} ms)")
+    if help_s * 1000 > args.help_budget_ms:
+        failures.append("gc_vgamepad.py --help is over budget")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Startup within budget")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
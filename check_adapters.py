@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Checks spreading controllers over several Bluetooth adapters with a fake backend standing in for bleak on three
+adapters, each seeing its own subset of the simulated controllers from soak_bridge.py. The bridge runs through
+run_bridge(): every controller has to connect through an adapter that saw it, with the adapters evenly loaded,
+and one that drops out is released and comes back on the least loaded adapter it can reach.
+"""
+
+import os
+import sys
+import asyncio
+
+import check_common
+import gc_vgamepad
+from gc_adapters import AdapterPool
+from soak_bridge import SimulatedDevice, SimulatedScanner, SimulatedClient
+
+ADAPTERS = ["hci0", "hci1", "hci2"]
+# Controller index -> adapters that can reach it
+VISIBILITY = {
+    0: ["hci2"],
+    1: ["hci0", "hci1"],
+    2: ADAPTERS,
+    3: ADAPTERS,
+    4: ADAPTERS,
+    5: ADAPTERS,
+}
+# Long enough that nothing drops out unless a check makes it
+LIFETIME = 3600.0
+
+class AdapterDevice(SimulatedDevice):
+    """BlueZ keeps a device object per adapter, the same controller seen twice is two of them"""
+
+    def __init__(self, index, adapter):
+        super().__init__(index)
+        self.adapter = adapter
+
+class MultiAdapterBackend:
+    def __init__(self, visibility):
+        # adapter -> devices it sees
+        self.devices = {adapter: [] for adapter in ADAPTERS}
+        for index, adapters in visibility.items():
+            for adapter in adapters:
+                self.devices[adapter].append(AdapterDevice(index, adapter))
+        # address -> live clients
+        self.clients = {}
+        # (address, adapter asked for, adapter of the device object) per connection
+        self.connections = []
+
+    def scanner(self, detection_callback, adapter=None, **kwargs):
+        # A controller connected through any adapter stops advertising on all of them
+        connected = {client.device.address for clients in self.clients.values() for client in clients if client.is_connected}
+        return SimulatedScanner([device for device in self.devices[adapter] if device.address not in connected], detection_callback)
+
+    def client(self, device, adapter=None):
+        self.connections.append((device.address, adapter, device.adapter))
+        client = SimulatedClient(device, LIFETIME)
+        self.clients.setdefault(device.address, []).append(client)
+        return client
+
+def address_of(index):
+    return SimulatedDevice(index).address
+
+def adapter_counts(pool):
+    return {adapter: sum(1 for assigned in pool.assigned.values() if assigned == adapter) for adapter in ADAPTERS}
+
+async def wait_until(condition, timeout):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition() and loop.time() < deadline:
+        await asyncio.sleep(0.1)
+    return condition()
+
+def check_pool(check):
+    pool = AdapterPool(["hci0", "hci1"])
+    pool.assigned = {"A": "hci0", "B": "hci1", "C": "hci1"}
+    pool.rates = {"A": 250.0, "B": 60.0, "C": 60.0}
+    check(pool.assign("D") == "hci1", "measured report rates outweigh controller counts")
+    check(pool.assign("E", ["hci0", "hci9"]) == "hci0", "only adapters that saw the controller are candidates")
+    pool.release("E")
+    check("E" not in pool.assigned and pool.load("hci0") == 250.0, "release() takes a controller off its adapter's load")
+
+async def run_checks(check, directory):
+    # Simulated controllers stay out of the real pairing cache
+    gc_vgamepad.PAIRING_CACHE_FILE = os.path.join(directory, "ns2_controllers.json")
+    check_pool(check)
+
+    backend = MultiAdapterBackend(VISIBILITY)
+    bridge = asyncio.create_task(gc_vgamepad.run_bridge(backend=backend, output='none', adapter=ADAPTERS))
+    everyone = lambda: len(gc_vgamepad.connected_controllers()) == len(VISIBILITY)
+    check(await wait_until(everyone, 15.0), f"all {len(VISIBILITY)} controllers connect")
+    pool = gc_vgamepad.adapter_pool
+
+    check(all(adapter == device_adapter for _, adapter, device_adapter in backend.connections),
+          "every client is created with the device object of the adapter it connects through")
+    check(all(pool.assigned.get(address_of(index)) in adapters for index, adapters in VISIBILITY.items()),
+          "every controller is on an adapter that saw it")
+    check(pool.assigned.get(address_of(0)) == "hci2", "the controller only one adapter sees gets that adapter")
+    check(adapter_counts(pool) == {adapter: 2 for adapter in ADAPTERS}, f"controllers are spread evenly ({pool.describe()})")
+
+    dropped = address_of(1)
+    adapter = pool.assigned.get(dropped)
+    backend.clients[dropped][-1].drop()
+    released = await wait_until(lambda: dropped not in pool.assigned, 2.0)
+    check(released and adapter_counts(pool)[adapter] == 1, "a controller that drops out is released from its adapter")
+
+    check(await wait_until(lambda: everyone() and dropped in pool.assigned, 15.0), "it reconnects on the next scan")
+    check(pool.assigned.get(dropped) == adapter and adapter_counts(pool) == {adapter: 2 for adapter in ADAPTERS},
+          "it goes back to the least loaded adapter it can reach")
+    streaming = [address for address in pool.assigned if address != dropped]
+    check(all(pool.rates.get(address, 0) > 0 for address in streaming), "report rates of streaming controllers are measured on reconnect")
+
+    gc_vgamepad.stop_bridge()
+    await bridge
+
+if __name__ == "__main__":
+    sys.exit(check_common.run(run_checks, "Controllers are spread over the fake adapters", temp_dir=True))
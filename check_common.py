@@ -0,0 +1,36 @@
+"""
+Shared by the check_*.py scripts, which only hold their checks: runs them with the bridge's own console output
+sent nowhere, lists every check and turns the outcome into the exit status.
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+import contextlib
+
+def run(run_checks, summary, temp_dir=False):
+    """
+    run_checks(check) is a function or coroutine function calling check(condition, message) for each check,
+    with temp_dir it's run_checks(check, directory) with a temp directory removed afterwards.
+    Returns the exit status for sys.exit().
+    """
+    out = sys.stdout
+    failures = []
+
+    def check(condition, message):
+        print(f"{'✅' if condition else '❌'} {message}", file=out, flush=True)
+        if not condition:
+            failures.append(message)
+
+    with contextlib.ExitStack() as stack:
+        args = (stack.enter_context(tempfile.TemporaryDirectory()),) if temp_dir else ()
+        devnull = stack.enter_context(open(os.devnull, "w"))
+        stack.enter_context(contextlib.redirect_stdout(devnull))
+        result = run_checks(check, *args)
+        if asyncio.iscoroutine(result):
+            asyncio.run(result)
+    if failures:
+        return 1
+    print(f"✅ {summary}", file=out, flush=True)
+    return 0
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Checks the bridge's wired path with a FIFO standing in for a /dev/hidraw node: USB reports written to it
+are read through HidrawReader on the asyncio loop, decoded with the USB layout and come out of the same
+output stage as BLE reports, checked through gc_vgamepad.session. Closing the writer is an unplug.
+"""
+
+import os
+import sys
+import asyncio
+
+import check_common
+import gc_vgamepad
+from gc_vgamepad import USB_BUTTON_MAP, PRODUCT_ID_GC, normalize_axis
+
+USB_REPORT_SIZE = 64
+STICK_CENTER = 1998
+
+def usb_report(buttons=(), lx=STICK_CENTER, ly=STICK_CENTER, rx=STICK_CENTER, ry=STICK_CENTER, l=0, r=0):
+    """buttons are (byte, mask) keys of USB_BUTTON_MAP, sticks are raw 12 bit values"""
+    report = bytearray(USB_REPORT_SIZE)
+    for byte, mask in buttons:
+        report[byte] |= mask
+    report[6:9] = bytes([lx & 0xFF, ((lx >> 8) & 0x0F) | ((ly & 0x0F) << 4), ly >> 4])
+    report[9:12] = bytes([rx & 0xFF, ((rx >> 8) & 0x0F) | ((ry & 0x0F) << 4), ry >> 4])
+    report[13] = l
+    report[14] = r
+    return bytes(report)
+
+async def collect(iterator, items):
+    async for item in iterator:
+        items.append(item)
+
+async def wait_for_items(items, count, timeout=1.0):
+    """The items once there are count of them, None when they don't show up in time"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while len(items) < count and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+    return items if len(items) >= count else None
+
+async def run_checks(check, directory):
+    path = os.path.join(directory, "hidraw")
+    os.mkfifo(path)
+    gc_vgamepad.output_backend = 'none'
+    states = []
+    events = []
+    collectors = [
+        asyncio.create_task(collect(gc_vgamepad.session.states(latest=False, maxsize=256), states)),
+        asyncio.create_task(collect(gc_vgamepad.session.events(), events)),
+    ]
+    await asyncio.sleep(0)
+    # Held open read-write so the reader doesn't see EOF before the first report
+    writer = os.open(path, os.O_RDWR)
+    controller = gc_vgamepad.open_wired_controller(path, PRODUCT_ID_GC)
+    check(controller is not None and controller['connected'], "FIFO opens as a wired controller")
+    if controller is None:
+        return
+
+    os.write(writer, usb_report())
+    state = (await wait_for_items(states, 1) or [None])[-1]
+    check(state is not None and state.buttons == 0 and (state.lx, state.ly, state.rx, state.ry, state.l, state.r) == (0, 0, 0, 0, 0, 0),
+          "neutral report decodes to no buttons and centered sticks")
+
+    wrong = []
+    for key, bit in USB_BUTTON_MAP.items():
+        count = len(states) + 1
+        os.write(writer, usb_report(buttons=[key]))
+        state = (await wait_for_items(states, count) or [None])[-1]
+        if state is None or state.buttons != 1 << bit:
+            wrong.append(bit.name)
+    check(not wrong, f"every button in USB_BUTTON_MAP decodes to its SW2 bit{'' if not wrong else ': ' + ', '.join(wrong)}")
+
+    count = len(states) + 1
+    os.write(writer, usb_report(lx=3249, ly=746, rx=746, ry=3249, l=0x80, r=0xFF))
+    state = (await wait_for_items(states, count) or [None])[-1]
+    expected = (normalize_axis(3249), -normalize_axis(746), normalize_axis(746), -normalize_axis(3249), 0x80, 0xFF)
+    check(state is not None and (state.lx, state.ly, state.rx, state.ry, state.l, state.r) == expected,
+          "sticks come from bytes 6-11, triggers from bytes 13 and 14")
+
+    a_bit = USB_BUTTON_MAP[(3, 0x02)]
+    check([event.pressed for event in events if event.button == a_bit] == [True, False], "button edges reach session.events()")
+
+    count = len(states)
+    os.write(writer, usb_report(buttons=[(3, 0x01), (4, 0x08), (5, 0x01)]) * 4)
+    await asyncio.sleep(0.2)
+    check(len(states) == count + 1, "reports that queued up are drained in one wakeup, repeats of the same state are dropped")
+
+    os.close(writer)
+    for _ in range(20):
+        if not controller['connected']:
+            break
+        await asyncio.sleep(0.05)
+    check(not controller['connected'] and path not in gc_vgamepad.controllers, "closing the writer disconnects the controller")
+    for task in collectors:
+        task.cancel()
+    await asyncio.gather(*collectors, return_exceptions=True)
+
+if __name__ == "__main__":
+    sys.exit(check_common.run(run_checks, "Wired path works with a FIFO for hidraw", temp_dir=True))
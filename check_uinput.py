@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Checks the uinput output with a temp file standing in for /dev/uinput: decoded controller states go through
+gc_vgamepad's write_uinput_gamepad, the input_event records written to the file are read back and compared
+with what an Xbox 360 pad would report. Runs anywhere, no uinput access needed.
+"""
+
+import os
+import sys
+
+import check_common
+import gc_uinput
+from gc_uinput import INPUT_EVENT, EV_KEY, EV_ABS, EV_SYN, SYN_REPORT, XBOX_AXES
+from gc_vgamepad import SW2, GC_BUTTON_MAP, UINPUT_BUTTON_MAP, write_uinput_gamepad
+
+NEUTRAL = (0, 0, 0, 0, 0, 0)
+
+def read_frames(path, offset):
+    """Frames (lists of (type, code, value) up to SYN_REPORT) written since offset, and the new offset"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    frames = []
+    frame = []
+    for index in range(0, len(data) - len(data) % INPUT_EVENT.size, INPUT_EVENT.size):
+        _, _, event_type, code, value = INPUT_EVENT.unpack_from(data, index)
+        if event_type == EV_SYN and code == SYN_REPORT:
+            frames.append(frame)
+            frame = []
+        else:
+            frame.append((event_type, code, value))
+    return frames, offset + len(data)
+
+def run_checks(check, directory):
+    path = os.path.join(directory, "uinput")
+    open(path, "wb").close()
+    pad = gc_uinput.UinputGamepad("NS2 check", path)
+    check(not pad.is_uinput, "a regular file is written to without the uinput ioctls")
+    offset = 0
+
+    write_uinput_gamepad(pad, (0, list(NEUTRAL)))
+    frames, offset = read_frames(path, offset)
+    check(len(frames) == 1 and sorted(frames[0]) == sorted((EV_ABS, code, 0) for code, _, _ in XBOX_AXES),
+          "first frame sets every axis, in a single SYN_REPORT frame")
+
+    write_uinput_gamepad(pad, (0, list(NEUTRAL)))
+    frames, offset = read_frames(path, offset)
+    check(not frames, "an unchanged state writes nothing")
+
+    wrong = []
+    for bit, name in GC_BUTTON_MAP.items():
+        if name not in UINPUT_BUTTON_MAP:
+            continue
+        code = UINPUT_BUTTON_MAP[name]
+        write_uinput_gamepad(pad, (1 << bit, list(NEUTRAL)))
+        write_uinput_gamepad(pad, (0, list(NEUTRAL)))
+        frames, offset = read_frames(path, offset)
+        if frames != [[(EV_KEY, code, 1)], [(EV_KEY, code, 0)]]:
+            wrong.append(name)
+    check(not wrong, f"every mapped button presses and releases its key{'' if not wrong else ': ' + ', '.join(wrong)}")
+
+    write_uinput_gamepad(pad, ((1 << SW2.UP) | (1 << SW2.RIGHT), [1000, 2000, -3000, -4000, 10, 250]))
+    frames, offset = read_frames(path, offset)
+    expected = {
+        (EV_ABS, gc_uinput.ABS_X, 1000), (EV_ABS, gc_uinput.ABS_Y, -2000),
+        (EV_ABS, gc_uinput.ABS_RX, -3000), (EV_ABS, gc_uinput.ABS_RY, 4000),
+        (EV_ABS, gc_uinput.ABS_Z, 10), (EV_ABS, gc_uinput.ABS_RZ, 250),
+        (EV_ABS, gc_uinput.ABS_HAT0X, 1), (EV_ABS, gc_uinput.ABS_HAT0Y, -1),
+    }
+    check(len(frames) == 1 and set(frames[0]) == expected, "sticks (Y pointing down), triggers and the D-pad hat in one frame")
+
+    write_uinput_gamepad(pad, ((1 << SW2.UP) | (1 << SW2.RIGHT), [1000, 2000, -3000, -4000, 10, 0]))
+    frames, offset = read_frames(path, offset)
+    check(frames == [[(EV_ABS, gc_uinput.ABS_RZ, 0)]], "only what changed is written")
+
+    real_write = gc_uinput.os.write
+    def failing_write(fd, data):
+        raise BlockingIOError(11, "Resource temporarily unavailable")
+    gc_uinput.os.write = failing_write
+    try:
+        write_uinput_gamepad(pad, ((1 << SW2.UP) | (1 << SW2.RIGHT) | (1 << SW2.A), [1000, 2000, -3000, -4000, 10, 0]))
+    except OSError:
+        pass
+    finally:
+        gc_uinput.os.write = real_write
+    write_uinput_gamepad(pad, ((1 << SW2.UP) | (1 << SW2.RIGHT) | (1 << SW2.A), [1000, 2000, -3000, -4000, 10, 0]))
+    frames, offset = read_frames(path, offset)
+    check(frames == [[(EV_KEY, gc_uinput.BTN_A, 1)]], "a failed write is sent again with the next report")
+
+    pad.close()
+    check(write_uinput_gamepad(pad, (0, list(NEUTRAL))) is None and read_frames(path, offset)[0] == [],
+          "a closed pad ignores writes")
+
+if __name__ == "__main__":
+    sys.exit(check_common.run(run_checks, "uinput output works against a temp file", temp_dir=True))
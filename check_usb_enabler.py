@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Checks gc_usb_enabler.py against a fake USB backend and a fake udev hotplug source, no pyusb, pyudev or hardware needed:
+controllers present at start and plugged in later get the enable and LED sequence, each its own player,
+foreign devices are left alone, failed opens are retried and unplugged controllers are released.
+"""
+
+import os
+import sys
+import asyncio
+import threading
+
+import check_common
+import gc_usb_enabler
+from gc_usb_enabler import UsbEnabler, DEFAULT_REPORT_DATA, USB_LED_DEV_ID_MAP, VENDOR_ID
+
+BULK_OUT_ENDPOINT = 0x02
+
+def device_info(index, vendor_id=VENDOR_ID, product_id=0x2073):
+    return {
+        'key': f"/sys/devices/fake/usb1/1-{index}",
+        'vendor_id': vendor_id,
+        'product_id': product_id,
+        'busnum': 1,
+        'devnum': index,
+    }
+
+class FakeHandle:
+    def __init__(self):
+        self.writes = []
+        self.closed = False
+
+    def find_bulk_out_endpoint(self):
+        return BULK_OUT_ENDPOINT
+
+    def write(self, endpoint, data):
+        self.writes.append((endpoint, bytes(data)))
+
+    def close(self):
+        self.closed = True
+
+class FakeUsbBackend:
+    """open_device() fails the first failures[devnum] times, like a node udev hasn't set permissions on yet"""
+
+    def __init__(self, failures=None):
+        self.failures = dict(failures or {})
+        self.handles = {}
+
+    def open_device(self, busnum, devnum):
+        if self.failures.get(devnum):
+            self.failures[devnum] -= 1
+            return None
+        handle = FakeHandle()
+        self.handles.setdefault(devnum, []).append(handle)
+        return handle
+
+class SlowUsbBackend(FakeUsbBackend):
+    """open_device() blocks until released, like libusb on a device that is slow to answer"""
+
+    def __init__(self):
+        super().__init__()
+        self.opening = threading.Event()
+        self.release = threading.Event()
+
+    def open_device(self, busnum, devnum):
+        self.opening.set()
+        self.release.wait()
+        return super().open_device(busnum, devnum)
+
+class FakeHotplugSource:
+    """Events are queued with emit(), a pipe makes the enabler's add_reader fire like the udev netlink socket does"""
+
+    def __init__(self, existing=()):
+        self.existing = list(existing)
+        self.events = []
+        self.read_fd, self.write_fd = os.pipe()
+
+    def fileno(self):
+        return self.read_fd
+
+    def existing_devices(self):
+        for info in self.existing:
+            yield 'add', info
+
+    def emit(self, action, info):
+        self.events.append((action, info))
+        os.write(self.write_fd, b"\x00")
+
+    def read_events(self):
+        os.read(self.read_fd, 64)
+        while self.events:
+            yield self.events.pop(0)
+
+    def close(self):
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+async def settle():
+    # Enabling runs in the default executor, give it a few rounds
+    for _ in range(20):
+        await asyncio.sleep(gc_usb_enabler.USB_OPEN_RETRY_DELAY / 4)
+
+def led_of(handle):
+    return handle.writes[1][1][8]
+
+async def run_checks(check):
+    backend = FakeUsbBackend(failures={3: 2})
+    hotplug = FakeHotplugSource(existing=[device_info(1), device_info(9, vendor_id=0x045E, product_id=0x028E)])
+    enabler = UsbEnabler(backend, hotplug)
+    await enabler.start()
+    await settle()
+    first = backend.handles.get(1, [None])[0]
+    check(first is not None and first.writes[0] == (BULK_OUT_ENDPOINT, DEFAULT_REPORT_DATA), "controller present at start gets the enable sequence")
+    check(first is not None and led_of(first) == USB_LED_DEV_ID_MAP[0], "it gets the player 1 LED")
+    check(9 not in backend.handles and len(enabler.devices) == 1, "devices of other vendors are left alone")
+
+    hotplug.emit('add', device_info(2))
+    await settle()
+    second = backend.handles.get(2, [None])[0]
+    check(second is not None and led_of(second) == USB_LED_DEV_ID_MAP[1], "controller plugged in later gets the player 2 LED")
+
+    hotplug.emit('add', device_info(3))
+    await settle()
+    third = backend.handles.get(3, [None])[0]
+    check(third is not None and led_of(third) == USB_LED_DEV_ID_MAP[2], "open failing twice is retried until it works")
+
+    hotplug.emit('remove', device_info(2))
+    await settle()
+    check(second is not None and second.closed and device_info(2)['key'] not in enabler.devices, "unplugged controller is closed and released")
+    hotplug.emit('add', device_info(4))
+    await settle()
+    fourth = backend.handles.get(4, [None])[0]
+    check(fourth is not None and led_of(fourth) == USB_LED_DEV_ID_MAP[1], "the freed player slot goes to the next controller")
+
+    bridge_players = UsbEnabler(FakeUsbBackend(), FakeHotplugSource(existing=[device_info(5)]), player_for=lambda info: 6)
+    await bridge_players.start()
+    await settle()
+    fifth = bridge_players.backend.handles.get(5, [None])[0]
+    check(fifth is not None and led_of(fifth) == USB_LED_DEV_ID_MAP[5], "player_for() decides the LED when the bridge passes one")
+    bridge_players.stop()
+    bridge_players.hotplug.close()
+
+    slow = UsbEnabler(SlowUsbBackend(), FakeHotplugSource(existing=[device_info(6)]))
+    await slow.start()
+    await asyncio.get_running_loop().run_in_executor(None, slow.backend.opening.wait)
+    slow.stop()
+    slow.backend.release.set()
+    await settle()
+    in_flight = slow.backend.handles.get(6, [None])[0]
+    check(in_flight is not None and in_flight.closed, "a controller still being opened when stop() is called is closed once it opens")
+    slow.hotplug.close()
+
+    enabler.stop()
+    check(all(handle.closed for handles in backend.handles.values() for handle in handles), "stop() closes every controller")
+    hotplug.close()
+
+if __name__ == "__main__":
+    sys.exit(check_common.run(run_checks, "USB enabler works against the fake backend"))
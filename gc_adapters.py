@@ -0,0 +1,75 @@
+"""
+Spreading controllers over several Bluetooth adapters (bleak's adapter= on BlueZ).
+A single adapter runs out of connection events with more than three or four controllers,
+so each connection goes to the adapter carrying the lowest observed report rate.
+"""
+
+import os
+import time
+
+# Assumed for controllers we haven't measured yet, the SW2 controllers stream at about this rate
+NOMINAL_REPORT_RATE = 125.0
+
+def find_bluez_adapters():
+    try:
+        return sorted(name for name in os.listdir("/sys/class/bluetooth") if name.startswith("hci") and ":" not in name)
+    except OSError:
+        return []
+
+class BleakBackend:
+    """Creates the bleak scanners and clients, swap it for a fake to run without radios"""
+
+    def scanner(self, detection_callback, adapter=None, **kwargs):
+        from bleak import BleakScanner
+        if adapter:
+            kwargs['adapter'] = adapter
+        return BleakScanner(detection_callback=detection_callback, **kwargs)
+
+    def client(self, device, adapter=None):
+        from bleak import BleakClient
+        if adapter:
+            return BleakClient(device, adapter=adapter)
+        return BleakClient(device)
+
+class AdapterPool:
+    """
+    Tracks which adapter every controller is connected through and how many reports/s each one delivers.
+    adapters is a list of adapter names, [None] means the system default adapter.
+    """
+
+    def __init__(self, adapters=None, backend=None):
+        self.adapters = list(adapters) if adapters else [None]
+        self.backend = backend or BleakBackend()
+        # address -> adapter
+        self.assigned = {}
+        # address -> reports/s, kept after a disconnect so a reconnect starts from the last measurement
+        self.rates = {}
+        # address -> (report count, monotonic time) of the last sample
+        self.samples = {}
+
+    def sample(self, address, report_count):
+        now = time.monotonic()
+        previous = self.samples.get(address)
+        self.samples[address] = (report_count, now)
+        if previous and report_count >= previous[0] and now > previous[1]:
+            self.rates[address] = (report_count - previous[0]) / (now - previous[1])
+
+    def load(self, adapter):
+        return sum(self.rates.get(address, NOMINAL_REPORT_RATE) for address, assigned in self.assigned.items() if assigned == adapter)
+
+    def assign(self, address, candidates=None):
+        """Pick the least loaded adapter out of candidates (the adapters that saw the controller)"""
+        candidates = [adapter for adapter in candidates or () if adapter in self.adapters] or self.adapters
+        adapter = min(candidates, key=lambda adapter: (self.load(adapter), self.adapters.index(adapter)))
+        self.assigned[address] = adapter
+        return adapter
+
+    def release(self, address):
+        self.assigned.pop(address, None)
+        self.samples.pop(address, None)
+
+    def describe(self):
+        return ", ".join(
+            f"{adapter or 'default'}: {sum(1 for assigned in self.assigned.values() if assigned == adapter)} controllers, {self.load(adapter):.0f} reports/s"
+            for adapter in self.adapters
+        )
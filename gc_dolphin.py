@@ -0,0 +1,85 @@
+"""
+Dolphin pipe input output, one FIFO per controller driven with Dolphin's text commands
+(PRESS A, SET MAIN x y, ...), bypassing the virtual gamepad driver and Dolphin's controller polling.
+Only changes are sent, each report's commands go out in a single os.write.
+"""
+
+import os
+import errno
+import stat
+
+DEFAULT_PIPE_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "dolphin-emu", "Pipes")
+
+# Button bit i in a button mask stands for DOLPHIN_BUTTONS[i]
+DOLPHIN_BUTTONS = ("A", "B", "X", "Y", "Z", "START", "L", "R", "D_UP", "D_DOWN", "D_LEFT", "D_RIGHT")
+PRESS_COMMANDS = tuple(f"PRESS {button}\n".encode() for button in DOLPHIN_BUTTONS)
+RELEASE_COMMANDS = tuple(f"RELEASE {button}\n".encode() for button in DOLPHIN_BUTTONS)
+# Dolphin's GameCube axes are 8 bit, so every value it can tell apart is pre-encoded
+AXIS_TEXT = tuple(f"{value / 255:.4f}".encode() for value in range(256))
+
+def quantize_stick(value):
+    # -32768..32767 -> 0..255
+    value = (value + 32768) >> 8
+    return 0 if value < 0 else 255 if value > 255 else value
+
+class DolphinPipe:
+    """write_state(buttons, main_x, main_y, c_x, c_y, l, r) takes a button mask over DOLPHIN_BUTTONS and 0-255 axes"""
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.mkfifo(path)
+        elif not stat.S_ISFIFO(os.stat(path).st_mode):
+            raise ValueError(f"{path} exists and is not a FIFO")
+        self.path = path
+        # Opening read-write doesn't wait for Dolphin to open its end (Linux)
+        self.fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+        self.reset()
+
+    def reset(self):
+        self.buttons = 0
+        self.axes = [None] * 6
+
+    def write_state(self, buttons, main_x, main_y, c_x, c_y, l, r):
+        commands = []
+        changed = buttons ^ self.buttons
+        if changed:
+            self.buttons = buttons
+            index = 0
+            while changed:
+                if changed & 1:
+                    commands.append(PRESS_COMMANDS[index] if (buttons >> index) & 1 else RELEASE_COMMANDS[index])
+                changed >>= 1
+                index += 1
+        axes = self.axes
+        if axes[0] != main_x or axes[1] != main_y:
+            axes[0] = main_x
+            axes[1] = main_y
+            commands.append(b"SET MAIN " + AXIS_TEXT[main_x] + b" " + AXIS_TEXT[main_y] + b"\n")
+        if axes[2] != c_x or axes[3] != c_y:
+            axes[2] = c_x
+            axes[3] = c_y
+            commands.append(b"SET C " + AXIS_TEXT[c_x] + b" " + AXIS_TEXT[c_y] + b"\n")
+        if axes[4] != l:
+            axes[4] = l
+            commands.append(b"SET L " + AXIS_TEXT[l] + b"\n")
+        if axes[5] != r:
+            axes[5] = r
+            commands.append(b"SET R " + AXIS_TEXT[r] + b"\n")
+        if not commands:
+            return False
+        try:
+            os.write(self.fd, b"".join(commands))
+        except OSError as e:
+            if e.errno != errno.EAGAIN:
+                raise
+            # Dolphin isn't draining the pipe, send the full state once it does
+            self.reset()
+            return False
+        return True
+
+    def close(self):
+        if self.fd is None:
+            return
+        os.close(self.fd)
+        self.fd = None
@@ -0,0 +1,101 @@
+"""
+Wired controllers through Linux hidraw nodes, read non-blocking on the asyncio loop.
+Decoding of the USB report layout lives with the BLE decoding in gc_vgamepad.py.
+New nodes are announced by HidrawHotplugMonitor (pyudev) the moment udev has set them up.
+"""
+
+import os
+import glob
+import errno
+
+HIDRAW_READ_SIZE = 64
+
+def find_hidraw_devices(vendor_id, product_ids):
+    """Yields (device node, product id) for every hidraw node belonging to one of the given controllers"""
+    for uevent_path in sorted(glob.glob("/sys/class/hidraw/hidraw*/device/uevent")):
+        try:
+            with open(uevent_path) as f:
+                uevent = f.read()
+        except OSError:
+            continue
+        for line in uevent.splitlines():
+            # HID_ID=<bus>:<vendor>:<product>
+            if not line.startswith("HID_ID="):
+                continue
+            _, vid, pid = line[len("HID_ID="):].split(":")
+            if int(vid, 16) == vendor_id and int(pid, 16) in product_ids:
+                node = uevent_path.split("/")[4]
+                yield f"/dev/{node}", int(pid, 16)
+            break
+
+def hidraw_usb_path(path):
+    """sysfs path of the USB device a hidraw node belongs to (udev's sys_path for it), None for pipes and the like"""
+    device = os.path.realpath(f"/sys/class/hidraw/{os.path.basename(path)}/device")
+    while device.startswith("/sys/devices/"):
+        if os.path.exists(os.path.join(device, "busnum")):
+            return device
+        device = os.path.dirname(device)
+    return None
+
+class HidrawHotplugMonitor:
+    """udev events for hidraw nodes, fileno() goes to loop.add_reader and read_events() yields (action, device node)"""
+
+    def __init__(self):
+        import pyudev
+        self.context = pyudev.Context()
+        self.monitor = pyudev.Monitor.from_netlink(self.context)
+        self.monitor.filter_by(subsystem='hidraw')
+        self.monitor.start()
+
+    def fileno(self):
+        return self.monitor.fileno()
+
+    def read_events(self):
+        while True:
+            device = self.monitor.poll(timeout=0)
+            if device is None:
+                return
+            yield device.action, device.device_node
+
+class HidrawReader:
+    """
+    Feeds every report read from a hidraw node (or a pipe/pty standing in for one) to callback(data).
+    on_close() is called once when the device goes away.
+    """
+
+    def __init__(self, path, callback, on_close=None):
+        self.path = path
+        self.callback = callback
+        self.on_close = on_close
+        self.fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        self.loop = None
+
+    def start(self, loop):
+        self.loop = loop
+        loop.add_reader(self.fd, self.on_readable)
+
+    def on_readable(self):
+        # hidraw hands out one report per read, drain everything that queued up since the last wakeup
+        while self.fd is not None:
+            try:
+                data = os.read(self.fd, HIDRAW_READ_SIZE)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                if e.errno not in (errno.ENODEV, errno.EIO):
+                    raise
+                data = b""
+            if not data:
+                self.close()
+                return
+            self.callback(data)
+
+    def close(self):
+        if self.fd is None:
+            return
+        if self.loop:
+            self.loop.remove_reader(self.fd)
+        os.close(self.fd)
+        self.fd = None
+        if self.on_close:
+            self.on_close()
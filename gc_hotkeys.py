@@ -0,0 +1,156 @@
+"""
+Controller hotkeys: chords (buttons held together, optionally for a while) and button sequences,
+compiled once into lookup tables so a report costs the same however many hotkeys there are.
+Matchers only run on button edges, the bridge skips them while the button word doesn't change.
+
+Spec syntax: HOME+PLUS=action, HOME+PLUS:2=action (held 2 seconds), UP,UP,DOWN,DOWN=action (sequence)
+"""
+
+import asyncio
+import time
+from collections import namedtuple
+
+# Longest pause between two presses of a sequence
+SEQUENCE_TIMEOUT = 1.0
+
+# buttons is the chord mask (0 for sequences), sequence the bits pressed one after another
+Hotkey = namedtuple('Hotkey', 'spec buttons hold sequence action')
+
+def parse_button(name, button_names):
+    bit = button_names.get(name.strip().upper())
+    if bit is None:
+        raise ValueError(f"unknown button '{name.strip()}'")
+    return bit
+
+def parse_hotkey(spec, button_names, actions):
+    """button_names maps upper case names to button bits, actions are the valid action names"""
+    keys, separator, action = spec.rpartition("=")
+    action = action.strip().lower()
+    if not separator or not keys.strip():
+        raise ValueError(f"hotkey '{spec}' needs BUTTONS=ACTION")
+    if action not in actions:
+        raise ValueError(f"hotkey '{spec}': unknown action '{action}' (available: {', '.join(sorted(actions))})")
+    if "," in keys:
+        sequence = tuple(parse_button(name, button_names) for name in keys.split(","))
+        return Hotkey(spec, 0, 0.0, sequence, action)
+    keys, _, hold = keys.partition(":")
+    buttons = 0
+    for name in keys.split("+"):
+        buttons |= 1 << parse_button(name, button_names)
+    try:
+        hold = float(hold.rstrip("s")) if hold else 0.0
+    except ValueError:
+        raise ValueError(f"hotkey '{spec}': hold time must be in seconds")
+    return Hotkey(spec, buttons, hold, (), action)
+
+class HotkeyEngine:
+    """
+    Chords become a dict from the exact button mask to its actions. Sequences are compiled Aho-Corasick style
+    into a DFA over pressed buttons, (state, bit) -> state, so overlapping sequences need no backtracking.
+    """
+
+    def __init__(self, hotkeys, sequence_timeout=SEQUENCE_TIMEOUT):
+        self.sequence_timeout = sequence_timeout
+        # button mask -> [(hold seconds, action)]
+        self.chords = {}
+        # (state, bit) -> state, missing entries go back to state 0
+        self.transitions = {}
+        # state -> actions of every sequence ending there
+        self.outputs = {}
+        sequences = []
+        for hotkey in hotkeys:
+            if hotkey.sequence:
+                sequences.append(hotkey)
+            else:
+                self.chords.setdefault(hotkey.buttons, []).append((hotkey.hold, hotkey.action))
+        self.compile_sequences(sequences)
+
+    def compile_sequences(self, sequences):
+        # Trie of all sequences
+        goto = [{}]
+        outputs = {}
+        for hotkey in sequences:
+            state = 0
+            for bit in hotkey.sequence:
+                if bit not in goto[state]:
+                    goto.append({})
+                    goto[state][bit] = len(goto) - 1
+                state = goto[state][bit]
+            outputs.setdefault(state, []).append(hotkey.action)
+        alphabet = {bit for hotkey in sequences for bit in hotkey.sequence}
+        # Breadth first: every state's transitions are its trie edges, the rest come from its failure state
+        fail = {0: 0}
+        queue = []
+        for bit, child in goto[0].items():
+            fail[child] = 0
+            queue.append(child)
+        for bit in alphabet:
+            target = goto[0].get(bit, 0)
+            if target:
+                self.transitions[(0, bit)] = target
+        while queue:
+            state = queue.pop(0)
+            outputs.setdefault(state, [])
+            outputs[state] = outputs[state] + [action for action in outputs.get(fail[state], []) if action not in outputs[state]]
+            for bit in alphabet:
+                child = goto[state].get(bit)
+                if child is not None:
+                    fail[child] = self.transitions.get((fail[state], bit), 0)
+                    queue.append(child)
+                    target = child
+                else:
+                    target = self.transitions.get((fail[state], bit), 0)
+                if target:
+                    self.transitions[(state, bit)] = target
+        self.outputs = {state: actions for state, actions in outputs.items() if actions}
+
+    def matcher(self, dispatch):
+        return HotkeyMatcher(self, dispatch)
+
+class HotkeyMatcher:
+    """Per controller state, update(buttons) is only called when the button word changed"""
+
+    def __init__(self, engine, dispatch):
+        self.engine = engine
+        self.dispatch = dispatch
+        self.buttons = 0
+        self.state = 0
+        self.last_press = 0.0
+        self.timers = []
+
+    def update(self, buttons):
+        pressed = buttons & ~self.buttons
+        self.buttons = buttons
+        if self.timers:
+            self.cancel_timers()
+        if not pressed:
+            return
+        chord = self.engine.chords.get(buttons)
+        if chord:
+            for hold, action in chord:
+                if hold:
+                    self.timers.append(asyncio.get_running_loop().call_later(hold, self.dispatch, action))
+                else:
+                    self.dispatch(action)
+        if self.engine.transitions:
+            now = time.monotonic()
+            if now - self.last_press > self.engine.sequence_timeout:
+                self.state = 0
+            self.last_press = now
+            transitions = self.engine.transitions
+            while pressed:
+                low = pressed & -pressed
+                self.state = transitions.get((self.state, low.bit_length() - 1), 0)
+                for action in self.engine.outputs.get(self.state, ()):
+                    self.dispatch(action)
+                pressed ^= low
+
+    def cancel_timers(self):
+        for timer in self.timers:
+            timer.cancel()
+        self.timers.clear()
+
+    def reset(self):
+        self.cancel_timers()
+        self.buttons = 0
+        self.state = 0
@@ -0,0 +1,85 @@
+"""
+Idle detection for stationary controllers. A report whose input bytes match the previous one is dropped after a
+bytes compare, one that decodes to the same buttons with sticks and triggers within noise of the last state passed
+on is dropped before any output. After timeout seconds without a change the controller is in low-work mode until
+the next change.
+"""
+
+import time
+
+IDLE_TIMEOUT = 5.0
+# Normalized stick units (±32767), about 3 counts of the 12 bit stick ADC
+IDLE_STICK_NOISE = 80
+IDLE_TRIGGER_NOISE = 2
+# Dropped reports between idle timeout checks, keeps time.monotonic() off the per report path
+IDLE_CHECK_EVERY = 32
+# In low-work mode motion goes out for every IDLE_MOTION_EVERY-th report while the controller lies still: every gyro
+# axis (bias corrected) and the accelerometer's change since it came to rest within noise. Anything more wakes it
+IDLE_MOTION_EVERY = 8
+IDLE_GYRO_NOISE_DPS = 1.5
+IDLE_ACCEL_NOISE_G = 0.02
+
+class IdleDetector:
+    """Per controller, buttons and axes are the last state that was passed on to the outputs"""
+
+    def __init__(self, timeout=IDLE_TIMEOUT):
+        self.timeout = timeout
+        self.inputs = None
+        self.buttons = None
+        self.axes = None
+        # Accelerometer reading the controller came to rest at
+        self.rest = None
+        self.changed_at = time.monotonic()
+        self.low_work = False
+        self.skipped = 0
+
+    def same_inputs(self, inputs):
+        """Raw input bytes compare, remembers them when they differ"""
+        if inputs == self.inputs:
+            return True
+        self.inputs = inputs
+        return False
+
+    def changed(self, buttons, axes):
+        """False while the buttons match and every axis is within noise, otherwise buttons and axes become the new state"""
+        last = self.axes
+        if buttons == self.buttons and (
+            abs(axes[0] - last[0]) <= IDLE_STICK_NOISE and abs(axes[1] - last[1]) <= IDLE_STICK_NOISE
+            and abs(axes[2] - last[2]) <= IDLE_STICK_NOISE and abs(axes[3] - last[3]) <= IDLE_STICK_NOISE
+            and abs(axes[4] - last[4]) <= IDLE_TRIGGER_NOISE and abs(axes[5] - last[5]) <= IDLE_TRIGGER_NOISE
+        ):
+            return False
+        self.buttons = buttons
+        self.axes = axes
+        self.changed_at = time.monotonic()
+        return True
+
+    def still(self, motion):
+        """True while motion is within noise, otherwise the controller is taken to rest at this reading again"""
+        rest = self.rest
+        if rest is not None and (
+            abs(motion[3]) <= IDLE_GYRO_NOISE_DPS and abs(motion[4]) <= IDLE_GYRO_NOISE_DPS and abs(motion[5]) <= IDLE_GYRO_NOISE_DPS
+            and abs(motion[0] - rest[0]) <= IDLE_ACCEL_NOISE_G and abs(motion[1] - rest[1]) <= IDLE_ACCEL_NOISE_G
+            and abs(motion[2] - rest[2]) <= IDLE_ACCEL_NOISE_G
+        ):
+            return True
+        self.rest = motion
+        return False
+
+    def skip(self):
+        """Counts a dropped report, True when the controller has just gone into low-work mode"""
+        self.skipped += 1
+        if self.low_work or self.skipped % IDLE_CHECK_EVERY:
+            return False
+        if time.monotonic() - self.changed_at < self.timeout:
+            return False
+        self.low_work = True
+        return True
+
+    def touch(self):
+        """Something other than the inputs changed, restarts the idle timeout"""
+        self.changed_at = time.monotonic()
+
+    def wake(self):
+        self.low_work = False
+        self.changed_at = time.monotonic()
@@ -0,0 +1,223 @@
+"""
+Motion support: IMU decoding with gyro bias calibration and a DSU (cemuhook protocol) server,
+so Dolphin and other emulators can take motion from the bridge over UDP.
+"""
+
+import asyncio
+import random
+import struct
+import time
+import zlib
+
+DSU_DEFAULT_PORT = 26760
+DSU_PROTOCOL_VERSION = 1001
+DSU_MSG_VERSION = 0x100000
+DSU_MSG_PORTS = 0x100001
+DSU_MSG_PAD_DATA = 0x100002
+DSU_SLOTS = 4
+# Clients re-request pad data about once a second
+DSU_CLIENT_TIMEOUT = 5.0
+
+DSU_STATE_DISCONNECTED = 0
+DSU_STATE_CONNECTED = 2
+DSU_MODEL_FULL_GYRO = 2
+DSU_CONNECTION_USB = 1
+DSU_CONNECTION_BLUETOOTH = 2
+
+# magic, protocol version, length after header, crc32, sender id
+DSU_HEADER = struct.Struct("<4sHHII")
+DSU_MESSAGE_TYPE = struct.Struct("<I")
+# slot, state, model, connection type, mac, battery
+DSU_SHARED = struct.Struct("<BBBB6sB")
+# connected, packet number, buttons1, buttons2, home, touch button, LX, LY, RX, RY,
+# dpad left/down/right/up, Y/B/A/X, R1/L1/R2/L2 (analog), touch points, motion timestamp (us), accel xyz (g), gyro pitch/yaw/roll (deg/s)
+DSU_PAD_DATA = struct.Struct("<BI4B4B4B4B4B12sQ6f")
+DSU_PAYLOAD_OFFSET = DSU_HEADER.size + DSU_MESSAGE_TYPE.size
+DSU_PAD_DATA_OFFSET = DSU_PAYLOAD_OFFSET + DSU_SHARED.size
+DSU_PAD_PACKET_SIZE = DSU_PAD_DATA_OFFSET + DSU_PAD_DATA.size
+DSU_INFO_PACKET_SIZE = DSU_PAD_DATA_OFFSET + 1
+DSU_CRC_OFFSET = 8
+NO_TOUCH = bytes(12)
+
+# DSU button bits: buttons1 in the high byte, buttons2 in the low byte
+DSU_SHARE = 0x0100
+DSU_L3 = 0x0200
+DSU_R3 = 0x0400
+DSU_OPTIONS = 0x0800
+DSU_DPAD_UP = 0x1000
+DSU_DPAD_RIGHT = 0x2000
+DSU_DPAD_DOWN = 0x4000
+DSU_DPAD_LEFT = 0x8000
+DSU_L2 = 0x0001
+DSU_R2 = 0x0002
+DSU_L1 = 0x0004
+DSU_R1 = 0x0008
+DSU_NORTH = 0x0010
+DSU_EAST = 0x0020
+DSU_SOUTH = 0x0040
+DSU_WEST = 0x0080
+
+# Accelerometer and gyro, one int16 triple each
+IMU_SAMPLE = struct.Struct("<6h")
+ACCEL_G_PER_LSB = 1.0 / 4096.0
+GYRO_DPS_PER_LSB = 2000.0 / 32768.0
+IMU_CALIBRATION_SAMPLES = 200
+# Raw gyro magnitude below which the controller counts as lying still for bias calibration
+IMU_STATIONARY_LSB = 200
+
+def mac_bytes(address):
+    parts = address.split(":")
+    if len(parts) != 6:
+        # CoreBluetooth UUIDs and hidraw paths have no MAC to offer
+        return bytes(6)
+    return bytes(int(part, 16) for part in parts)
+
+class ImuDecoder:
+    """Decodes the motion sample at offset in each report, subtracting a gyro bias learned while the controller is still"""
+
+    def __init__(self, offset):
+        self.offset = offset
+        self.end = offset + IMU_SAMPLE.size
+        self.bias = (0, 0, 0)
+        self.bias_sum = [0, 0, 0]
+        self.bias_samples = 0
+
+    def calibrated(self):
+        return self.bias_samples >= IMU_CALIBRATION_SAMPLES
+
+    def decode(self, data):
+        if len(data) < self.end:
+            return None
+        ax, ay, az, gx, gy, gz = IMU_SAMPLE.unpack_from(data, self.offset)
+        if self.bias_samples < IMU_CALIBRATION_SAMPLES:
+            if abs(gx) < IMU_STATIONARY_LSB and abs(gy) < IMU_STATIONARY_LSB and abs(gz) < IMU_STATIONARY_LSB:
+                self.bias_sum[0] += gx
+                self.bias_sum[1] += gy
+                self.bias_sum[2] += gz
+                self.bias_samples += 1
+                if self.bias_samples == IMU_CALIBRATION_SAMPLES:
+                    self.bias = tuple(total / IMU_CALIBRATION_SAMPLES for total in self.bias_sum)
+        bx, by, bz = self.bias
+        return (
+            ax * ACCEL_G_PER_LSB, ay * ACCEL_G_PER_LSB, az * ACCEL_G_PER_LSB,
+            (gx - bx) * GYRO_DPS_PER_LSB, (gy - by) * GYRO_DPS_PER_LSB, (gz - bz) * GYRO_DPS_PER_LSB,
+        )
+
+def dsu_stick(value):
+    # -32768..32767 -> 0..255, centered on 128
+    value = (value >> 8) + 128
+    return 0 if value < 0 else 255 if value > 255 else value
+
+class DsuServer(asyncio.DatagramProtocol):
+    """
+    Cemuhook DSU server. Pad packets are preallocated per slot and encoded once per report,
+    then sent as-is to every subscribed client.
+    """
+
+    def __init__(self):
+        self.server_id = random.getrandbits(32)
+        self.transport = None
+        # client address -> (expiry, slot or None, mac or None)
+        self.clients = {}
+        self.slots = [None] * DSU_SLOTS
+        self.info_buffers = [bytearray(DSU_INFO_PACKET_SIZE) for _ in range(DSU_SLOTS)]
+        for slot in range(DSU_SLOTS):
+            self.build_info_packet(slot)
+        self.version_buffer = bytearray(DSU_PAYLOAD_OFFSET + 2)
+        self.pack_header(self.version_buffer, DSU_MSG_VERSION)
+        struct.pack_into("<H", self.version_buffer, DSU_PAYLOAD_OFFSET, DSU_PROTOCOL_VERSION)
+        self.finish_packet(self.version_buffer)
+
+    async def start(self, host="127.0.0.1", port=DSU_DEFAULT_PORT):
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, local_addr=(host, port))
+
+    def close(self):
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def pack_header(self, buf, message_type):
+        DSU_HEADER.pack_into(buf, 0, b"DSUS", DSU_PROTOCOL_VERSION, len(buf) - DSU_HEADER.size, 0, self.server_id)
+        DSU_MESSAGE_TYPE.pack_into(buf, DSU_HEADER.size, message_type)
+
+    def finish_packet(self, buf):
+        struct.pack_into("<I", buf, DSU_CRC_OFFSET, 0)
+        struct.pack_into("<I", buf, DSU_CRC_OFFSET, zlib.crc32(buf))
+
+    def build_info_packet(self, slot):
+        buf = self.info_buffers[slot]
+        self.pack_header(buf, DSU_MSG_PORTS)
+        entry = self.slots[slot]
+        if entry:
+            DSU_SHARED.pack_into(buf, DSU_PAYLOAD_OFFSET, slot, DSU_STATE_CONNECTED, DSU_MODEL_FULL_GYRO, entry['connection_type'], entry['mac'], entry['battery'])
+        else:
+            DSU_SHARED.pack_into(buf, DSU_PAYLOAD_OFFSET, slot, DSU_STATE_DISCONNECTED, 0, 0, bytes(6), 0)
+        self.finish_packet(buf)
+
+    def connect_slot(self, slot, address, connection_type, battery=0):
+        buf = bytearray(DSU_PAD_PACKET_SIZE)
+        self.pack_header(buf, DSU_MSG_PAD_DATA)
+        mac = mac_bytes(address)
+        DSU_SHARED.pack_into(buf, DSU_PAYLOAD_OFFSET, slot, DSU_STATE_CONNECTED, DSU_MODEL_FULL_GYRO, connection_type, mac, battery)
+        self.slots[slot] = {'buffer': buf, 'mac': mac, 'connection_type': connection_type, 'battery': battery, 'packet_number': 0}
+        self.build_info_packet(slot)
+
+    def disconnect_slot(self, slot):
+        self.slots[slot] = None
+        self.build_info_packet(slot)
+
+    def datagram_received(self, data, addr):
+        if len(data) < DSU_PAYLOAD_OFFSET:
+            return
+        magic, version, length, crc, _ = DSU_HEADER.unpack_from(data, 0)
+        if magic != b"DSUC" or version > DSU_PROTOCOL_VERSION or len(data) < DSU_HEADER.size + length:
+            return
+        message_type = DSU_MESSAGE_TYPE.unpack_from(data, DSU_HEADER.size)[0]
+        if message_type == DSU_MSG_VERSION:
+            self.transport.sendto(self.version_buffer, addr)
+        elif message_type == DSU_MSG_PORTS and len(data) >= DSU_PAYLOAD_OFFSET + 4:
+            count = struct.unpack_from("<i", data, DSU_PAYLOAD_OFFSET)[0]
+            for slot in data[DSU_PAYLOAD_OFFSET + 4:DSU_PAYLOAD_OFFSET + 4 + max(0, min(count, DSU_SLOTS))]:
+                if slot < DSU_SLOTS:
+                    self.transport.sendto(self.info_buffers[slot], addr)
+        elif message_type == DSU_MSG_PAD_DATA and len(data) >= DSU_PAYLOAD_OFFSET + 8:
+            flags, slot = data[DSU_PAYLOAD_OFFSET], data[DSU_PAYLOAD_OFFSET + 1]
+            mac = bytes(data[DSU_PAYLOAD_OFFSET + 2:DSU_PAYLOAD_OFFSET + 8])
+            # flags: 0 = all slots, 1 = by slot, 2 = by MAC
+            self.clients[addr] = (
+                time.monotonic() + DSU_CLIENT_TIMEOUT,
+                slot if flags & 1 else None,
+                mac if flags & 2 else None,
+            )
+
+    def send_pad_data(self, slot, buttons, home, sticks, l2, r2, motion):
+        """buttons is the 16-bit DSU button word, sticks (LX, LY, RX, RY) in -32768..32767, triggers 0-255"""
+        entry = self.slots[slot]
+        if not self.clients or not entry or not self.transport:
+            return
+        buf = entry['buffer']
+        entry['packet_number'] = (entry['packet_number'] + 1) & 0xFFFFFFFF
+        ax, ay, az, pitch, yaw, roll = motion or (0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+        DSU_PAD_DATA.pack_into(
+            buf, DSU_PAD_DATA_OFFSET,
+            1, entry['packet_number'], buttons >> 8, buttons & 0xFF, 1 if home else 0, 0,
+            dsu_stick(sticks[0]), dsu_stick(sticks[1]), dsu_stick(sticks[2]), dsu_stick(sticks[3]),
+            255 if buttons & DSU_DPAD_LEFT else 0, 255 if buttons & DSU_DPAD_DOWN else 0,
+            255 if buttons & DSU_DPAD_RIGHT else 0, 255 if buttons & DSU_DPAD_UP else 0,
+            255 if buttons & DSU_WEST else 0, 255 if buttons & DSU_SOUTH else 0,
+            255 if buttons & DSU_EAST else 0, 255 if buttons & DSU_NORTH else 0,
+            255 if buttons & DSU_R1 else 0, 255 if buttons & DSU_L1 else 0, r2, l2,
+            NO_TOUCH, time.monotonic_ns() // 1000, ax, ay, az, pitch, yaw, roll,
+        )
+        self.finish_packet(buf)
+        now = time.monotonic()
+        mac = entry['mac']
+        for addr, (expires, wanted_slot, wanted_mac) in list(self.clients.items()):
+            if expires < now:
+                del self.clients[addr]
+            elif (wanted_slot is None or wanted_slot == slot) and (wanted_mac is None or wanted_mac == mac):
+                self.transport.sendto(buf, addr)
@@ -0,0 +1,75 @@
+"""
+Dedicated thread for blocking virtual-pad driver calls (ViGEmBus through ctypes, uinput),
+so a stalling driver never holds up the asyncio loop that takes in controller reports.
+"""
+
+import threading
+
+class OutputThread:
+    """
+    One single-slot mailbox per controller: put() replaces whatever state the thread hasn't written yet,
+    so a slow driver drops intermediate states instead of building up a queue.
+    """
+
+    def __init__(self, name="gamepad-output"):
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.mailboxes = {}
+        self.running = False
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.written = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.on_error = None
+
+    def start(self):
+        self.running = True
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        self.running = False
+        self.wakeup.set()
+        self.thread.join(timeout)
+
+    def put(self, key, write, value):
+        """Called from the event loop, never blocks on the driver. write(value) runs on the output thread."""
+        with self.lock:
+            if key in self.mailboxes:
+                self.coalesced += 1
+            self.mailboxes[key] = (write, value)
+        self.wakeup.set()
+
+    def discard(self, key):
+        with self.lock:
+            self.mailboxes.pop(key, None)
+
+    def close(self, key, close):
+        """
+        Drops key's pending state and runs close() on the output thread, so it can't close a device under a write in flight.
+        The close gets a mailbox of its own, a controller reconnecting under the same key doesn't replace it.
+        """
+        with self.lock:
+            self.mailboxes.pop(key, None)
+            if self.running:
+                self.mailboxes[object()] = (lambda value: close(), None)
+                self.wakeup.set()
+                return
+        close()
+
+    def run(self):
+        while True:
+            self.wakeup.wait()
+            # Clear before taking the mailboxes, a put() racing with us sets the event again
+            self.wakeup.clear()
+            with self.lock:
+                mailboxes, self.mailboxes = self.mailboxes, {}
+            for write, value in mailboxes.values():
+                try:
+                    write(value)
+                    self.written += 1
+                except Exception as e:
+                    self.errors += 1
+                    if self.on_error:
+                        self.on_error(e)
+            if not self.running:
+                return
@@ -0,0 +1,87 @@
+"""
+On-demand sampling profiler for the running bridge. A thread samples every other thread's stack at a fixed
+interval for a while and writes collapsed stacks (flamegraph.pl, speedscope, inferno), plus a per-stage summary.
+Nothing runs and nothing is hooked until a profile is started.
+"""
+
+import os
+import sys
+import time
+import threading
+
+DEFAULT_INTERVAL = 0.002
+
+class SamplingProfiler:
+    """stages are function names to attribute samples to, the innermost one on a stack gets the sample"""
+
+    def __init__(self, stages=(), interval=DEFAULT_INTERVAL):
+        self.stages = tuple(stages)
+        self.interval = interval
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.on_done = None
+        self.labels = {}
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, duration, path):
+        if self.running:
+            return False
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, args=(duration, path), name="profiler", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.stop_event.set()
+
+    def label(self, code):
+        label = self.labels.get(code)
+        if label is None:
+            name = getattr(code, 'co_qualname', code.co_name)
+            label = self.labels[code] = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def run(self, duration, path):
+        own_id = threading.get_ident()
+        # (thread name, codes from root to leaf) -> samples
+        counts = {}
+        thread_names = {}
+        samples = 0
+        end = time.monotonic() + duration
+        while not self.stop_event.is_set() and time.monotonic() < end:
+            frames = sys._current_frames()
+            if len(thread_names) != len(frames):
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                stack.reverse()
+                key = (thread_names.get(thread_id, str(thread_id)), tuple(stack))
+                counts[key] = counts.get(key, 0) + 1
+            del frames
+            samples += 1
+            self.stop_event.wait(self.interval)
+        summary = self.write(counts, samples, path)
+        if self.on_done:
+            self.on_done(path, summary)
+
+    def write(self, counts, samples, path):
+        stage_counts = {}
+        with open(path, "w") as f:
+            for (thread_name, stack), count in counts.items():
+                labels = [self.label(code) for code in stack]
+                f.write(f"{thread_name};{';'.join(labels)} {count}\n")
+                stage = next((code.co_name for code in reversed(stack) if code.co_name in self.stages), None)
+                stage_counts[stage] = stage_counts.get(stage, 0) + count
+        lines = [f"{samples} samples every {self.interval * 1000:g} ms"]
+        total = sum(stage_counts.values()) or 1
+        for stage, count in sorted(stage_counts.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"   {stage or 'other'}: {count} ({count * 100 / total:.1f}%)")
+        return lines
@@ -0,0 +1,58 @@
+"""
+Rumble frames for the NS2 controllers. XInput motor intensities are quantized and every frame the bridge can
+send is encoded up front, so producing a rumble packet is a table lookup.
+Pro Controller and Joy-Con have linear resonant actuators driven with a frequency/amplitude pair per band
+(large motor -> low band, small motor -> high band), the GameCube controller's motor is only on or off.
+"""
+
+# Frame: [0x50 rumble command, 0x50 | 4 bit counter, payload..., padding to RUMBLE_FRAME_SIZE]
+RUMBLE_COMMAND = 0x50
+RUMBLE_FRAME_SIZE = 8
+RUMBLE_COUNTER_VALUES = 16
+# Intensity steps per motor, finer steps aren't noticeable and would only grow the frame table
+RUMBLE_LEVELS = 16
+# The controllers stop rumbling on their own unless the frame is repeated
+RUMBLE_REFRESH_INTERVAL = 0.03
+
+# 10 bit frequency codes of the two bands, about 320 Hz and 160 Hz
+RUMBLE_HIGH_FREQ = 0x187
+RUMBLE_LOW_FREQ = 0x112
+RUMBLE_MAX_AMPLITUDE = 0x3FF
+
+def quantize_intensity(value):
+    """XInput motor intensity 0-255 -> 0..RUMBLE_LEVELS - 1, any non-zero intensity stays non-zero"""
+    value = 0 if value < 0 else 255 if value > 255 else value
+    return max((value * (RUMBLE_LEVELS - 1) + 127) // 255, 1 if value else 0)
+
+def encode_hd_bands(high_freq, high_amp, low_freq, low_amp):
+    """Both bands packed into 5 bytes, 10 bits each for frequency and amplitude"""
+    return bytes([
+        high_freq & 0xFF,
+        ((high_amp << 2) & 0xFC) | ((high_freq >> 8) & 0x03),
+        ((high_amp >> 6) & 0x0F) | ((low_freq << 4) & 0xF0),
+        ((low_amp << 6) & 0xC0) | ((low_freq >> 4) & 0x3F),
+        (low_amp >> 2) & 0xFF,
+    ])
+
+def hd_payload(large, small):
+    low_amp = large * RUMBLE_MAX_AMPLITUDE // (RUMBLE_LEVELS - 1)
+    high_amp = small * RUMBLE_MAX_AMPLITUDE // (RUMBLE_LEVELS - 1)
+    return encode_hd_bands(RUMBLE_HIGH_FREQ, high_amp, RUMBLE_LOW_FREQ, low_amp)
+
+def erm_payload(large, small):
+    return bytes([0x01 if max(large, small) > 0 else 0x00])
+
+class RumbleEncoder:
+    """frame(counter, large, small) with quantized levels, all RUMBLE_COUNTER_VALUES * RUMBLE_LEVELS² frames prebuilt"""
+
+    def __init__(self, hd=True):
+        payload = hd_payload if hd else erm_payload
+        payloads = [payload(large, small) for large in range(RUMBLE_LEVELS) for small in range(RUMBLE_LEVELS)]
+        self.frames = [
+            bytes(bytes([RUMBLE_COMMAND, RUMBLE_COMMAND | counter]) + data).ljust(RUMBLE_FRAME_SIZE, b"\x00")
+            for counter in range(RUMBLE_COUNTER_VALUES)
+            for data in payloads
+        ]
+
+    def frame(self, counter, large, small):
+        return self.frames[(counter * RUMBLE_LEVELS + large) * RUMBLE_LEVELS + small]
@@ -0,0 +1,128 @@
+"""
+Library API for tools embedding the bridge: decoded controller states and button edges as async iterators.
+
+    async for state in gc_vgamepad.session.states():
+        print(state.player, state.buttons, state.lx, state.ly)
+
+Nothing is built unless someone is iterating, the bridge only checks session.active per report.
+"""
+
+import asyncio
+import time
+from collections import deque, namedtuple
+
+# buttons is the SW2 button word, sticks in -32768..32767, triggers 0-255
+PadState = namedtuple('PadState', 'address player product_id timestamp buttons lx ly rx ry l r')
+# button is the SW2 bit that changed
+ButtonEvent = namedtuple('ButtonEvent', 'address player timestamp button pressed')
+# Sampled every couple of seconds, fields are None until known. rssi is from the last advertisement before connecting,
+# serial and the USB vendor/product IDs from the device info block read during init
+Telemetry = namedtuple('Telemetry', 'address player name battery_percent battery_mv report_rate rssi serial vendor_id product_id timestamp')
+
+class LatestSubscription:
+    """Keeps only the newest item per controller, a slow consumer skips intermediate states"""
+
+    def __init__(self, address=None):
+        self.address = address
+        self.pending = {}
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+    def push(self, address, item):
+        if address in self.pending:
+            self.dropped += 1
+        self.pending[address] = item
+        self.ready.set()
+
+    async def get(self):
+        while not self.pending:
+            self.ready.clear()
+            await self.ready.wait()
+        return self.pending.pop(next(iter(self.pending)))
+
+class QueueSubscription:
+    """Delivers every item in order, when the consumer falls maxsize items behind the oldest ones are dropped"""
+
+    def __init__(self, address=None, maxsize=64):
+        self.address = address
+        self.queue = deque(maxlen=maxsize)
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+    def push(self, address, item):
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(item)
+        self.ready.set()
+
+    async def get(self):
+        while not self.queue:
+            self.ready.clear()
+            await self.ready.wait()
+        return self.queue.popleft()
+
+class Session:
+    def __init__(self):
+        self.state_subscriptions = []
+        self.event_subscriptions = []
+        self.active = False
+        # address -> last button word, for the edges
+        self.buttons = {}
+        # address -> Telemetry of every connected controller
+        self.telemetry = {}
+
+    def update_active(self):
+        self.active = bool(self.state_subscriptions or self.event_subscriptions)
+        if not self.event_subscriptions:
+            self.buttons.clear()
+
+    async def iterate(self, subscriptions, subscription):
+        subscriptions.append(subscription)
+        self.update_active()
+        try:
+            while True:
+                yield await subscription.get()
+        finally:
+            subscriptions.remove(subscription)
+            self.update_active()
+
+    def states(self, address=None, latest=True, maxsize=64):
+        """
+        PadState for every report of the controller at address (all controllers when None) that changes its state,
+        repeats from an idle controller are dropped before they get here (see gc_idle.py).
+        latest=True only ever hands out the newest state per controller, latest=False queues up to maxsize states.
+        """
+        subscription = LatestSubscription(address) if latest else QueueSubscription(address, maxsize)
+        return self.iterate(self.state_subscriptions, subscription)
+
+    def events(self, address=None, maxsize=256):
+        """ButtonEvent for every button going down or up"""
+        return self.iterate(self.event_subscriptions, QueueSubscription(address, maxsize))
+
+    def publish(self, address, player, product_id, buttons, axes):
+        timestamp = time.monotonic()
+        if self.state_subscriptions:
+            state = PadState(address, player, product_id, timestamp, buttons, axes[0], axes[1], axes[2], axes[3], axes[4], axes[5])
+            for subscription in self.state_subscriptions:
+                if subscription.address is None or subscription.address == address:
+                    subscription.push(address, state)
+        if self.event_subscriptions:
+            changed = buttons ^ self.buttons.get(address, 0)
+            if not changed:
+                return
+            self.buttons[address] = buttons
+            while changed:
+                low = changed & -changed
+                event = ButtonEvent(address, player, timestamp, low.bit_length() - 1, bool(buttons & low))
+                for subscription in self.event_subscriptions:
+                    if subscription.address is None or subscription.address == address:
+                        subscription.push(address, event)
+                changed ^= low
+
+    def set_telemetry(self, telemetry):
+        self.telemetry[telemetry.address] = telemetry
+
+    def forget(self, address):
+        """The controller went away, the next time it shows up every held button is a new press"""
+        self.buttons.pop(address, None)
+        self.telemetry.pop(address, None)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Shared-memory controller state for other tools on the same host (overlays, input display, test harness).
+One block per controller, seqlock layout: writers bump the sequence to odd, write the payload, bump it to even.
+Readers retry while the sequence is odd or changed during the read.
+"""
+
+import re
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+
+SHM_NAME_PREFIX = "ns2_state_"
+SHM_MAGIC = b"NS2S"
+SHM_LAYOUT_VERSION = 1
+
+# magic, layout version, payload size
+SHM_HEADER = struct.Struct("<4sHH")
+SHM_SEQUENCE = struct.Struct("<I")
+# timestamp_ns, report counter, product id, button word, LX, LY, RX, RY, L trigger, R trigger
+SHM_PAYLOAD = struct.Struct("<QIHIiiiiBB")
+
+SHM_SEQUENCE_OFFSET = SHM_HEADER.size
+SHM_PAYLOAD_OFFSET = SHM_SEQUENCE_OFFSET + SHM_SEQUENCE.size
+SHM_BLOCK_SIZE = SHM_PAYLOAD_OFFSET + SHM_PAYLOAD.size
+
+SHM_READ_RETRIES = 100
+
+def shm_name_for_address(address):
+    # macOS limits POSIX shm names to 31 characters and reports CoreBluetooth UUIDs instead of MACs
+    return SHM_NAME_PREFIX + re.sub(r"[^0-9A-Za-z]", "", address)[-12:].lower()
+
+class StatePublisher:
+    """Single writer for one controller's shared-memory block"""
+
+    def __init__(self, address, product_id):
+        self.name = shm_name_for_address(address)
+        self.product_id = product_id
+        self.sequence = 0
+        self.report_count = 0
+        try:
+            self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=SHM_BLOCK_SIZE)
+        except FileExistsError:
+            # Stale block left behind by a crashed bridge, reuse it
+            self.shm = shared_memory.SharedMemory(name=self.name)
+            if self.shm.size < SHM_BLOCK_SIZE:
+                self.shm.close()
+                self.shm.unlink()
+                self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=SHM_BLOCK_SIZE)
+        self.buf = self.shm.buf
+        SHM_SEQUENCE.pack_into(self.buf, SHM_SEQUENCE_OFFSET, 0)
+        SHM_HEADER.pack_into(self.buf, 0, SHM_MAGIC, SHM_LAYOUT_VERSION, SHM_PAYLOAD.size)
+
+    def publish(self, button_data, axes):
+        self.report_count = (self.report_count + 1) & 0xFFFFFFFF
+        seq = self.sequence
+        SHM_SEQUENCE.pack_into(self.buf, SHM_SEQUENCE_OFFSET, (seq + 1) & 0xFFFFFFFF)
+        SHM_PAYLOAD.pack_into(
+            self.buf, SHM_PAYLOAD_OFFSET,
+            time.monotonic_ns(), self.report_count, self.product_id, button_data & 0xFFFFFFFF,
+            axes[0], axes[1], axes[2], axes[3], axes[4] & 0xFF, axes[5] & 0xFF,
+        )
+        self.sequence = (seq + 2) & 0xFFFFFFFF
+        SHM_SEQUENCE.pack_into(self.buf, SHM_SEQUENCE_OFFSET, self.sequence)
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.buf = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+def open_state(address):
+    """Attach to a controller's block as a reader. The bridge owns the block, so it is not unlinked on exit."""
+    shm = shared_memory.SharedMemory(name=shm_name_for_address(address))
+    try:
+        # Python < 3.13 registers attached blocks with the resource tracker, which would unlink them on exit
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    magic, version, payload_size = SHM_HEADER.unpack_from(shm.buf, 0)
+    if magic != SHM_MAGIC or version != SHM_LAYOUT_VERSION or payload_size != SHM_PAYLOAD.size:
+        shm.close()
+        raise ValueError(f"Unsupported state block layout in {shm.name}")
+    return shm
+
+def read_state(shm):
+    """Returns (timestamp_ns, report_count, product_id, buttons, LX, LY, RX, RY, L, R) or None if no consistent read"""
+    buf = shm.buf
+    for _ in range(SHM_READ_RETRIES):
+        seq = SHM_SEQUENCE.unpack_from(buf, SHM_SEQUENCE_OFFSET)[0]
+        if seq & 1:
+            continue
+        state = SHM_PAYLOAD.unpack_from(buf, SHM_PAYLOAD_OFFSET)
+        if SHM_SEQUENCE.unpack_from(buf, SHM_SEQUENCE_OFFSET)[0] == seq:
+            return state if seq else None
+    return None
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(f"Usage: {sys.argv[0]} <controller address>")
+        sys.exit(1)
+    shm = open_state(sys.argv[1])
+    try:
+        while True:
+            state = read_state(shm)
+            if state:
+                _, count, pid, buttons, lx, ly, rx, ry, lt, rt = state
+                print(f"\r#{count:<8d} PID:0x{pid:04X} Buttons:0x{buttons:08X} LX:{lx:6d} LY:{ly:6d} RX:{rx:6d} RY:{ry:6d} L:{lt:3d} R:{rt:3d}", end="")
+            time.sleep(0.01)
+    except KeyboardInterrupt:
+        print()
+    finally:
+        shm.close()
@@ -0,0 +1,58 @@
+"""
+Controller telemetry: battery from input reports, device info from the SPI block read during init,
+report rate and advertisement RSSI. Reports are only looked at every TELEMETRY_SAMPLE_EVERY reports.
+"""
+
+import struct
+
+# About every 2 seconds at the controllers' report rate
+TELEMETRY_SAMPLE_EVERY = 250
+
+# Battery voltage in millivolts, little endian, in the full BLE input report
+BATTERY_VOLTAGE_OFFSET = 0x1F
+BATTERY_EMPTY_MV = 3300
+BATTERY_FULL_MV = 4150
+# Anything outside is a report without a battery reading
+BATTERY_VALID_MV = (2800, 4600)
+BATTERY_LOW_PERCENT = 15
+
+# Device info block (SPI 0x13000): [0x02..0x11] serial number, ASCII padded with zeros, [0x12..0x15] USB vendor and product ID
+DEVICE_INFO_LAYOUT = struct.Struct("<2x16sHH")
+
+def decode_battery_mv(data):
+    if len(data) < BATTERY_VOLTAGE_OFFSET + 2:
+        return None
+    millivolts = data[BATTERY_VOLTAGE_OFFSET] | (data[BATTERY_VOLTAGE_OFFSET + 1] << 8)
+    if not BATTERY_VALID_MV[0] <= millivolts <= BATTERY_VALID_MV[1]:
+        return None
+    return millivolts
+
+def battery_percent(millivolts):
+    percent = (millivolts - BATTERY_EMPTY_MV) * 100 // (BATTERY_FULL_MV - BATTERY_EMPTY_MV)
+    return 0 if percent < 0 else 100 if percent > 100 else percent
+
+def parse_device_info(device_info):
+    """Serial number and USB IDs out of the device info block"""
+    info = {'serial': None, 'vendor_id': None, 'product_id': None}
+    if not device_info or len(device_info) < DEVICE_INFO_LAYOUT.size:
+        return info
+    serial, vendor_id, product_id = DEVICE_INFO_LAYOUT.unpack_from(device_info)
+    # An erased block reads as 0xFF
+    info['serial'] = serial.rstrip(b"\x00\xff").decode('ascii', 'replace') or None
+    if vendor_id not in (0, 0xFFFF):
+        info['vendor_id'] = vendor_id
+        info['product_id'] = product_id
+    return info
+
+def create_telemetry():
+    return {
+        'battery_mv': None,
+        'battery_percent': None,
+        'battery_warned': False,
+        'report_rate': None,
+        'rssi': None,
+        'serial': None,
+        'vendor_id': None,
+        'product_id': None,
+        'sampled_at': None,
+    }
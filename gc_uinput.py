@@ -0,0 +1,142 @@
+"""
+Native Linux uinput output, an Xbox 360 compatible evdev pad without vgamepad in between.
+Each report becomes one frame of input_event records for whatever changed plus SYN_REPORT,
+packed into a preallocated buffer and written with a single os.write.
+"""
+
+import os
+import stat
+import struct
+import fcntl
+
+EV_SYN = 0x00
+EV_KEY = 0x01
+EV_ABS = 0x03
+SYN_REPORT = 0
+
+BTN_A = 0x130
+BTN_B = 0x131
+BTN_X = 0x133
+BTN_Y = 0x134
+BTN_TL = 0x136
+BTN_TR = 0x137
+BTN_SELECT = 0x13a
+BTN_START = 0x13b
+BTN_MODE = 0x13c
+BTN_THUMBL = 0x13d
+BTN_THUMBR = 0x13e
+
+ABS_X = 0x00
+ABS_Y = 0x01
+ABS_Z = 0x02
+ABS_RX = 0x03
+ABS_RY = 0x04
+ABS_RZ = 0x05
+ABS_HAT0X = 0x10
+ABS_HAT0Y = 0x11
+ABS_CNT = 0x40
+
+# Key bit i in a key mask stands for XBOX_KEYS[i]
+XBOX_KEYS = (BTN_A, BTN_B, BTN_X, BTN_Y, BTN_TL, BTN_TR, BTN_SELECT, BTN_START, BTN_MODE, BTN_THUMBL, BTN_THUMBR)
+# Axis i in a state tuple, with its range (same layout as xpad)
+XBOX_AXES = (
+    (ABS_X, -32768, 32767),
+    (ABS_Y, -32768, 32767),
+    (ABS_RX, -32768, 32767),
+    (ABS_RY, -32768, 32767),
+    (ABS_Z, 0, 255),
+    (ABS_RZ, 0, 255),
+    (ABS_HAT0X, -1, 1),
+    (ABS_HAT0Y, -1, 1),
+)
+
+BUS_USB = 0x03
+XBOX360_VENDOR_ID = 0x045E
+XBOX360_PRODUCT_ID = 0x028E
+XBOX360_VERSION = 0x0110
+
+UI_SET_EVBIT = 0x40045564
+UI_SET_KEYBIT = 0x40045565
+UI_SET_ABSBIT = 0x40045567
+UI_DEV_CREATE = 0x5501
+UI_DEV_DESTROY = 0x5502
+
+# struct input_event: timeval (the kernel stamps uinput events itself), type, code, value
+INPUT_EVENT = struct.Struct("llHHi")
+# struct uinput_user_dev: name, input_id, ff_effects_max, absmax/absmin/absfuzz/absflat
+UINPUT_USER_DEV = struct.Struct(f"80sHHHHI{ABS_CNT}i{ABS_CNT}i{ABS_CNT}i{ABS_CNT}i")
+
+class UinputGamepad:
+    """
+    write_state(keys, axes) takes a key mask over XBOX_KEYS and one value per XBOX_AXES entry.
+    Anything that isn't a character device (a temp file or pipe) is written to without the uinput ioctls.
+    """
+
+    def __init__(self, name, path="/dev/uinput"):
+        self.fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        self.is_uinput = stat.S_ISCHR(os.fstat(self.fd).st_mode)
+        self.keys = 0
+        self.axes = [None] * len(XBOX_AXES)
+        self.buffer = bytearray(INPUT_EVENT.size * (len(XBOX_KEYS) + len(XBOX_AXES) + 1))
+        self.view = memoryview(self.buffer)
+        if self.is_uinput:
+            self.create_device(name)
+
+    def create_device(self, name):
+        fcntl.ioctl(self.fd, UI_SET_EVBIT, EV_KEY)
+        fcntl.ioctl(self.fd, UI_SET_EVBIT, EV_ABS)
+        for code in XBOX_KEYS:
+            fcntl.ioctl(self.fd, UI_SET_KEYBIT, code)
+        absmax = [0] * ABS_CNT
+        absmin = [0] * ABS_CNT
+        absfuzz = [0] * ABS_CNT
+        absflat = [0] * ABS_CNT
+        for code, minimum, maximum in XBOX_AXES:
+            fcntl.ioctl(self.fd, UI_SET_ABSBIT, code)
+            absmin[code] = minimum
+            absmax[code] = maximum
+        os.write(self.fd, UINPUT_USER_DEV.pack(
+            name.encode()[:79], BUS_USB, XBOX360_VENDOR_ID, XBOX360_PRODUCT_ID, XBOX360_VERSION, 0,
+            *absmax, *absmin, *absfuzz, *absflat,
+        ))
+        fcntl.ioctl(self.fd, UI_DEV_CREATE)
+
+    def write_state(self, keys, axes):
+        if self.fd is None:
+            return False
+        buf = self.buffer
+        size = INPUT_EVENT.size
+        offset = 0
+        changed = keys ^ self.keys
+        index = 0
+        while changed:
+            if changed & 1:
+                INPUT_EVENT.pack_into(buf, offset, 0, 0, EV_KEY, XBOX_KEYS[index], (keys >> index) & 1)
+                offset += size
+            changed >>= 1
+            index += 1
+        previous = self.axes
+        for index, value in enumerate(axes):
+            if previous[index] != value:
+                INPUT_EVENT.pack_into(buf, offset, 0, 0, EV_ABS, XBOX_AXES[index][0], value)
+                offset += size
+        if not offset:
+            return False
+        INPUT_EVENT.pack_into(buf, offset, 0, 0, EV_SYN, SYN_REPORT, 0)
+        os.write(self.fd, self.view[:offset + size])
+        # Only a frame that went out counts as sent, after a failed write the next report sends the whole delta again
+        self.keys = keys
+        previous[:] = axes
+        return True
+
+    def close(self):
+        """Call it from the thread that writes, the bridge hands it to OutputThread.close()"""
+        if self.fd is None:
+            return
+        if self.is_uinput:
+            try:
+                fcntl.ioctl(self.fd, UI_DEV_DESTROY)
+            except OSError:
+                pass
+        os.close(self.fd)
+        self.fd = None
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+NS2 USB Enabler (Python), port of gc_enabler_daemon.c
+Sends the init sequence to wired controllers as they are plugged in. Driven by udev hotplug events
+instead of polling, so it sleeps until something happens. Linux only (pyudev), needs pyusb.
+"""
+
+import asyncio
+import signal
+import argparse
+import threading
+
+VENDOR_ID = 0x057E
+PRODUCT_IDS = (0x2066, 0x2067, 0x2069, 0x2073)
+INTERFACE_NUM = 1
+USB_TIMEOUT_MS = 1000
+# udev announces the device before its node permissions are applied, give it a moment
+USB_OPEN_RETRIES = 5
+USB_OPEN_RETRY_DELAY = 0.2
+
+DEFAULT_REPORT_DATA = bytes([
+    0x03, 0x91, 0x00, 0x0d, 0x00, 0x08,
+    0x00, 0x00, 0x01, 0x00, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF,
+])
+SET_LED_DATA = bytes([
+    0x09, 0x91, 0x00, 0x07, 0x00, 0x08,
+    0x00, 0x00, 0x01, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
+])
+
+USB_LED_DEV_ID_MAP = [0x01, 0x02, 0x04, 0x08, 0x03, 0x06, 0x0C, 0x0F]
+
+debug_mode = False
+
+def log_debug(message):
+    if debug_mode:
+        print(f"[DEBUG] {message}")
+
+def build_set_led_data(player_num):
+    if player_num < 1 or player_num > 8:
+        player_num = 1
+    data = bytearray(SET_LED_DATA)
+    data[8] = USB_LED_DEV_ID_MAP[player_num - 1]
+    return bytes(data)
+
+class PyUsbDevice:
+    def __init__(self, device):
+        import usb.util
+        self.device = device
+        usb.util.claim_interface(device, INTERFACE_NUM)
+
+    def find_bulk_out_endpoint(self):
+        import usb.util
+        for interface in self.device[0]:
+            if interface.bInterfaceNumber != INTERFACE_NUM:
+                continue
+            for endpoint in interface:
+                if (usb.util.endpoint_type(endpoint.bmAttributes) == usb.util.ENDPOINT_TYPE_BULK and
+                        usb.util.endpoint_direction(endpoint.bEndpointAddress) == usb.util.ENDPOINT_OUT):
+                    return endpoint.bEndpointAddress
+        return None
+
+    def write(self, endpoint, data):
+        self.device.write(endpoint, data, USB_TIMEOUT_MS)
+
+    def close(self):
+        import usb.util
+        try:
+            usb.util.release_interface(self.device, INTERFACE_NUM)
+        except Exception:
+            # Already gone when the controller was unplugged
+            pass
+        usb.util.dispose_resources(self.device)
+
+class PyUsbBackend:
+    def open_device(self, busnum, devnum):
+        import usb.core
+        device = usb.core.find(bus=busnum, address=devnum)
+        if device is None:
+            return None
+        return PyUsbDevice(device)
+
+def udev_device_info(device):
+    # PRODUCT is "vid/pid/bcdDevice" in hex and is still present on remove events
+    product = device.properties.get('PRODUCT', '')
+    parts = product.split('/')
+    if len(parts) < 2:
+        return None
+    return {
+        'key': device.sys_path,
+        'vendor_id': int(parts[0], 16),
+        'product_id': int(parts[1], 16),
+        'busnum': int(device.properties.get('BUSNUM', 0) or 0),
+        'devnum': int(device.properties.get('DEVNUM', 0) or 0),
+    }
+
+class UdevHotplugSource:
+    def __init__(self):
+        import pyudev
+        self.context = pyudev.Context()
+        self.monitor = pyudev.Monitor.from_netlink(self.context)
+        self.monitor.filter_by(subsystem='usb', device_type='usb_device')
+        self.monitor.start()
+
+    def fileno(self):
+        return self.monitor.fileno()
+
+    def existing_devices(self):
+        for device in self.context.list_devices(subsystem='usb', DEVTYPE='usb_device'):
+            info = udev_device_info(device)
+            if info:
+                yield 'add', info
+
+    def read_events(self):
+        while True:
+            device = self.monitor.poll(timeout=0)
+            if device is None:
+                return
+            info = udev_device_info(device)
+            if info:
+                yield device.action, info
+
+class UsbEnabler:
+    """
+    Enables every supported controller that is or gets plugged in.
+    backend and hotplug can be replaced by fakes, see PyUsbBackend and UdevHotplugSource for the interface.
+    player_for(info) picks the player LED, the bridge passes its own slot assignment so LED and player agree.
+    """
+
+    def __init__(self, backend=None, hotplug=None, player_for=None):
+        self.backend = backend or PyUsbBackend()
+        self.hotplug = hotplug or UdevHotplugSource()
+        self.player_for = player_for or self.next_player
+        self.devices = {}
+        self.tasks = set()
+        self.loop = None
+        # Handles an executor thread opened that enable_device() hasn't taken over yet, guarded by lock
+        self.opened = set()
+        self.stopped = False
+        self.lock = threading.Lock()
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopped = False
+        self.loop.add_reader(self.hotplug.fileno(), self.on_hotplug_readable)
+        for action, info in self.hotplug.existing_devices():
+            self.handle_event(action, info)
+
+    def stop(self):
+        if self.loop:
+            self.loop.remove_reader(self.hotplug.fileno())
+        for task in self.tasks:
+            task.cancel()
+        # Cancelling doesn't stop an open running in the executor, it closes its handle itself once it sees stopped
+        with self.lock:
+            self.stopped = True
+            for handle in self.opened:
+                handle.close()
+            self.opened.clear()
+        for entry in self.devices.values():
+            if entry['handle']:
+                entry['handle'].close()
+        self.devices.clear()
+
+    def on_hotplug_readable(self):
+        for action, info in self.hotplug.read_events():
+            self.handle_event(action, info)
+
+    def handle_event(self, action, info):
+        if info['vendor_id'] != VENDOR_ID or info['product_id'] not in PRODUCT_IDS:
+            return
+        key = info['key']
+        if action == 'add' and key not in self.devices:
+            print(f"🔌 Device found (PID: 0x{info['product_id']:04X}).")
+            self.devices[key] = {'handle': None, 'player': self.player_for(info), 'info': info}
+            task = self.loop.create_task(self.enable_device(key))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        elif action == 'remove' and key in self.devices:
+            entry = self.devices.pop(key)
+            if entry['handle']:
+                entry['handle'].close()
+            print(f"🔌 Controller removed (PID: 0x{info['product_id']:04X}, P{entry['player']}).")
+
+    def next_player(self, info=None):
+        taken = {entry['player'] for entry in self.devices.values()}
+        return next((slot for slot in range(1, len(USB_LED_DEV_ID_MAP) + 1) if slot not in taken), len(USB_LED_DEV_ID_MAP))
+
+    async def enable_device(self, key):
+        entry = self.devices[key]
+        for attempt in range(USB_OPEN_RETRIES):
+            try:
+                # Blocking libusb calls stay off the event loop
+                handle = await self.loop.run_in_executor(None, self.open_and_enable, entry['info'], entry['player'])
+            except Exception as e:
+                log_debug(f"Enabling failed (attempt {attempt + 1}/{USB_OPEN_RETRIES}): {e}")
+                handle = None
+            if handle:
+                with self.lock:
+                    self.opened.discard(handle)
+                if self.devices.get(key) is not entry:
+                    # Unplugged while we were busy with it
+                    handle.close()
+                    return
+                entry['handle'] = handle
+                print(f"✅ Enabling done for P{entry['player']} (PID: 0x{entry['info']['product_id']:04X})!")
+                return
+            if self.devices.get(key) is not entry:
+                return
+            await asyncio.sleep(USB_OPEN_RETRY_DELAY)
+        print(f"❌ Could not enable controller (PID: 0x{entry['info']['product_id']:04X}).")
+
+    def player_of(self, key):
+        entry = self.devices.get(key)
+        return entry['player'] if entry else None
+
+    def open_and_enable(self, info, player):
+        handle = self.backend.open_device(info['busnum'], info['devnum'])
+        if not handle:
+            return None
+        endpoint = handle.find_bulk_out_endpoint()
+        if endpoint is None:
+            handle.close()
+            return None
+        handle.write(endpoint, DEFAULT_REPORT_DATA)
+        handle.write(endpoint, build_set_led_data(player))
+        with self.lock:
+            if self.stopped:
+                handle.close()
+                return None
+            self.opened.add(handle)
+        return handle
+
+async def main():
+    print("🎮 NS2 USB Enabler (Python)")
+    print("Waiting for controllers to be plugged in...")
+    enabler = UsbEnabler()
+    await enabler.start()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGINT, stop.set)
+    loop.add_signal_handler(signal.SIGTERM, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        enabler.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='NS2 USB Enabler (Python)')
+    parser.add_argument('-d', '--debug', action='store_true', help='Enable debug output')
+    args = parser.parse_args()
+    debug_mode = args.debug
+    try:
+        asyncio.run(main())
+    except ImportError as e:
+        print(f"❌ Missing dependency: {e.name} (pip install pyusb pyudev)")
+    finally:
+        print("✅ Daemon terminated.")
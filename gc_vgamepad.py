@@ -6,17 +6,30 @@ Joy Cons only work alone not together
 """
 
 import asyncio
+import functools
 import signal
 import sys
 import platform
 import argparse
-import threading
 import time
+import re
+import os
+import json
+from collections import deque
 from enum import IntEnum
-from bleak import BleakScanner, BleakClient
-import vgamepad as vg
-
-gamepad = vg.VX360Gamepad()
+from gc_hidraw import HidrawReader, HidrawHotplugMonitor, find_hidraw_devices, hidraw_usb_path
+import gc_motion
+from gc_output import OutputThread
+import gc_uinput
+import gc_dolphin
+from gc_adapters import AdapterPool, find_bluez_adapters
+from gc_session import Session, Telemetry
+from gc_watchdog import LoopWatchdog
+from gc_profiler import SamplingProfiler
+from gc_hotkeys import HotkeyEngine, parse_hotkey
+from gc_rumble import RumbleEncoder, quantize_intensity, RUMBLE_LEVELS, RUMBLE_REFRESH_INTERVAL
+import gc_telemetry
+from gc_idle import IdleDetector, IDLE_TIMEOUT, IDLE_MOTION_EVERY
 
 # Nintendo Switch Controller IDs
 VENDOR_ID = 0x057E
@@ -24,7 +37,19 @@ PRODUCT_ID_PRO = 0x2009
 PRODUCT_ID_L = 0x2006
 PRODUCT_ID_R = 0x2007
 PRODUCT_ID_GC = 0x2073
-rumble_counter = 0
+MAX_PLAYERS = 8
+
+# Bluetooth SIG company ID used in the controllers' manufacturer data
+NINTENDO_COMPANY_ID = 0x0553
+NINTENDO_NAME_PATTERN = re.compile(r"nintendo|pro controller|joy-con|joy con|joycon|switch", re.IGNORECASE)
+# Advertised PID -> USB PID
+NS2_PID_REMAP = {
+    0x7305: PRODUCT_ID_GC,
+    0x0920: PRODUCT_ID_PRO,
+    0x0620: PRODUCT_ID_L,
+    0x0720: PRODUCT_ID_R,
+}
+DEVICE_VERDICT_TTL = 30.0
 
 # UUIDs
 HID_SERVICE_UUID = "00001812-0000-1000-8000-00805f9b34fb"
@@ -33,6 +58,34 @@ NINTENDO_INPUT_UUID = "ab7de9be-89fe-49ad-828f-118f09df7fd2"
 
 BT_HID_LED_DEV_ID_MAP = [0x01, 0x02, 0x04, 0x08, 0x03, 0x06, 0x0C, 0x0F]
 
+# Init commands: [command, 0x91 request, 0x01 BLE interface, subcommand, 0x00, payload length, 0x00, 0x00, payload...]
+# Replies echo the command and subcommand at [0] and [3]
+SW2_CMD_READ_SPI = 0x02
+SW2_CMD_INIT = 0x03
+SW2_CMD_PAIRING = 0x15
+SW2_SUBCMD_READ_SPI = 0x04
+SW2_SUBCMD_ENABLE_REPORT = 0x0D
+SW2_SUBCMD_SET_BDADDR = 0x01
+SW2_SUBCMD_READ_LTK = 0x04
+SPI_DEVICE_INFO_ADDRESS = 0x00013000
+SPI_DEVICE_INFO_SIZE = 0x40
+SPI_LTK_ADDRESS = 0x001FA000
+SPI_LTK_SIZE = 0x10
+INIT_REPLY_TIMEOUT = 1.0
+# Replies start with an 8 byte header and echo the command's arguments (an SPI read's size and address), the payload follows
+INIT_REPLY_HEADER_SIZE = 8
+SPI_READ_ADDRESS_OFFSET = 12
+
+# Functions the profiler attributes samples to, select and wait are the loop and output thread idling
+PROFILE_STAGES = (
+    'notification_callback', 'usb_report_callback', 'dispatch_state', 'send_dsu_state',
+    'update_xbox_gamepad', 'write_uinput_gamepad', 'write_dolphin_pipe', 'send_command',
+    'scan_for_nintendo_devices', 'connect_to_device', 'handle_keyboard_input', 'select', 'wait',
+)
+
+PAIRING_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".ns2_controllers.json")
+BDADDR_PATTERN = re.compile(r"[0-9A-Fa-f]{2}(:[0-9A-Fa-f]{2}){5}")
+
 class ControllerState(IntEnum):
     READ_INFO = 0
     READ_LTK = 1
@@ -70,6 +123,18 @@ class SW2(IntEnum):
     GR = 24
     GL = 25
 
+# Steps in the same stage don't depend on each other and are sent back to back
+INIT_SEQUENCE_COLD = [
+    (ControllerState.READ_INFO, ControllerState.READ_LTK),
+    (ControllerState.SET_BDADDR,),
+    (ControllerState.READ_NEW_LTK,),
+    (ControllerState.SET_LED, ControllerState.EN_REPORT),
+]
+# Bonded controllers we already hold device info and LTK for
+INIT_SEQUENCE_WARM = [
+    (ControllerState.EN_REPORT, ControllerState.SET_LED),
+]
+
 # GameCube Controller Button Mapping
 GC_BUTTON_MAP = {
     SW2.A: "A",
@@ -90,19 +155,126 @@ GC_BUTTON_MAP = {
     SW2.RIGHT: "DPad-Right",
 }
 
-XBOX_BUTTON_MAP = {
-    "A": vg.XUSB_BUTTON.XUSB_GAMEPAD_A,
-    "B": vg.XUSB_BUTTON.XUSB_GAMEPAD_B,
-    "X": vg.XUSB_BUTTON.XUSB_GAMEPAD_X,
-    "Y": vg.XUSB_BUTTON.XUSB_GAMEPAD_Y,
-    "Start": vg.XUSB_BUTTON.XUSB_GAMEPAD_START,
-    "Z": vg.XUSB_BUTTON.XUSB_GAMEPAD_RIGHT_SHOULDER,
-    "ZL": vg.XUSB_BUTTON.XUSB_GAMEPAD_LEFT_SHOULDER,
-    "DPad-Up": vg.XUSB_BUTTON.XUSB_GAMEPAD_DPAD_UP,
-    "DPad-Down": vg.XUSB_BUTTON.XUSB_GAMEPAD_DPAD_DOWN,
-    "DPad-Left": vg.XUSB_BUTTON.XUSB_GAMEPAD_DPAD_LEFT,
-    "DPad-Right": vg.XUSB_BUTTON.XUSB_GAMEPAD_DPAD_RIGHT,
+def build_byte_table(bit_map):
+    """bit_map[i] are the output bits for bit i of a byte, returns the 256-entry table over all byte values"""
+    table = [0] * 256
+    for value in range(1, 256):
+        # Every value is a smaller one plus its lowest set bit
+        low = value & -value
+        table[value] = table[value ^ low] | bit_map[low.bit_length() - 1]
+    return table
+
+def build_button_tables(bit_values):
+    """SW2 bit -> output bits, as one 256-entry table per byte of the button word"""
+    return [build_byte_table([bit_values.get(8 * index + bit, 0) for bit in range(8)]) for index in range(4)]
+
+def lookup_buttons(tables, button_data):
+    return (tables[0][button_data & 0xFF] | tables[1][(button_data >> 8) & 0xFF] |
+            tables[2][(button_data >> 16) & 0xFF] | tables[3][(button_data >> 24) & 0xFF])
+
+# Wired (USB HID) GameCube report, see nso_gc2_monitor.c: [0] report ID, [3..5] buttons,
+# [6..11] sticks packed like the BLE report, [13] L trigger, [14] R trigger
+USB_REPORT_MIN_SIZE = 15
+USB_WIRED_PRODUCT_IDS = (PRODUCT_ID_GC,)
+USB_BUTTON_MAP = {
+    (3, 0x01): SW2.B,
+    (3, 0x02): SW2.A,
+    (3, 0x04): SW2.Y,
+    (3, 0x08): SW2.X,
+    (3, 0x10): SW2.R,
+    (3, 0x20): SW2.ZR,
+    (3, 0x40): SW2.PLUS,
+    (4, 0x01): SW2.DOWN,
+    (4, 0x02): SW2.RIGHT,
+    (4, 0x04): SW2.LEFT,
+    (4, 0x08): SW2.UP,
+    (4, 0x10): SW2.L,
+    (4, 0x20): SW2.ZL,
+    (5, 0x01): SW2.HOME,
+    (5, 0x02): SW2.CAPTURE,
+    (5, 0x04): SW2.GR,
+    (5, 0x08): SW2.GL,
+    (5, 0x10): SW2.C,
+}
+# Byte value -> SW2 button word for report bytes 3, 4 and 5, so decoding is three lookups
+USB_BUTTON_TABLES = [
+    build_byte_table([next((1 << bit for (byte, mask), bit in USB_BUTTON_MAP.items() if byte == index and mask == 1 << i), 0) for i in range(8)])
+    for index in (3, 4, 5)
+]
+
+# Motion sample (accel xyz, gyro xyz as int16) in Pro Controller / Joy-Con BLE reports
+IMU_REPORT_OFFSET = 0x30
+
+DSU_BUTTON_MAP = {
+    SW2.MINUS: gc_motion.DSU_SHARE,
+    SW2.LJ: gc_motion.DSU_L3,
+    SW2.RJ: gc_motion.DSU_R3,
+    SW2.PLUS: gc_motion.DSU_OPTIONS,
+    SW2.UP: gc_motion.DSU_DPAD_UP,
+    SW2.RIGHT: gc_motion.DSU_DPAD_RIGHT,
+    SW2.DOWN: gc_motion.DSU_DPAD_DOWN,
+    SW2.LEFT: gc_motion.DSU_DPAD_LEFT,
+    SW2.ZL: gc_motion.DSU_L2,
+    SW2.ZR: gc_motion.DSU_R2,
+    SW2.L: gc_motion.DSU_L1,
+    SW2.R: gc_motion.DSU_R1,
+    SW2.X: gc_motion.DSU_NORTH,
+    SW2.A: gc_motion.DSU_EAST,
+    SW2.B: gc_motion.DSU_SOUTH,
+    SW2.Y: gc_motion.DSU_WEST,
+}
+DSU_BUTTON_TABLES = build_button_tables(DSU_BUTTON_MAP)
+
+# XBOX_BUTTON_MAP names -> evdev keys of the uinput pad, the D-pad goes to the hat axes
+UINPUT_BUTTON_MAP = {
+    "A": gc_uinput.BTN_A,
+    "B": gc_uinput.BTN_B,
+    "X": gc_uinput.BTN_X,
+    "Y": gc_uinput.BTN_Y,
+    "Start": gc_uinput.BTN_START,
+    "Z": gc_uinput.BTN_TR,
+    "ZL": gc_uinput.BTN_TL,
+}
+# Key mask over gc_uinput.XBOX_KEYS
+UINPUT_KEY_TABLES = build_button_tables({
+    bit: 1 << gc_uinput.XBOX_KEYS.index(UINPUT_BUTTON_MAP[name]) for bit, name in GC_BUTTON_MAP.items() if name in UINPUT_BUTTON_MAP
+})
+
+# GC_BUTTON_MAP names -> Dolphin pipe buttons
+DOLPHIN_BUTTON_MAP = {
+    "A": "A",
+    "B": "B",
+    "X": "X",
+    "Y": "Y",
+    "Z": "Z",
+    "Start": "START",
+    "L": "L",
+    "R": "R",
+    "DPad-Up": "D_UP",
+    "DPad-Down": "D_DOWN",
+    "DPad-Left": "D_LEFT",
+    "DPad-Right": "D_RIGHT",
+}
+# Button mask over gc_dolphin.DOLPHIN_BUTTONS
+DOLPHIN_BUTTON_TABLES = build_button_tables({
+    bit: 1 << gc_dolphin.DOLPHIN_BUTTONS.index(DOLPHIN_BUTTON_MAP[name]) for bit, name in GC_BUTTON_MAP.items() if name in DOLPHIN_BUTTON_MAP
+})
+
+# GC_BUTTON_MAP names -> vgamepad XUSB_BUTTON names, resolved into XBOX_BUTTON_MAP once vgamepad is loaded
+XBOX_BUTTON_NAMES = {
+    "A": "XUSB_GAMEPAD_A",
+    "B": "XUSB_GAMEPAD_B",
+    "X": "XUSB_GAMEPAD_X",
+    "Y": "XUSB_GAMEPAD_Y",
+    "Start": "XUSB_GAMEPAD_START",
+    "Z": "XUSB_GAMEPAD_RIGHT_SHOULDER",
+    "ZL": "XUSB_GAMEPAD_LEFT_SHOULDER",
+    "DPad-Up": "XUSB_GAMEPAD_DPAD_UP",
+    "DPad-Down": "XUSB_GAMEPAD_DPAD_DOWN",
+    "DPad-Left": "XUSB_GAMEPAD_DPAD_LEFT",
+    "DPad-Right": "XUSB_GAMEPAD_DPAD_RIGHT",
 }
+XBOX_BUTTON_MAP = {}
 
 # Switch Pro/Joy-Con Button Mapping
 SWITCH_BUTTON_MAP = {
@@ -132,24 +304,92 @@ SWITCH_BUTTON_MAP = {
 }
 
 keep_running = True
+# False when embedded through run_bridge(): no signal handlers, no keyboard input, no status line
+interactive = True
 debug_mode = False
 verbose_mode = False
-controller_state = None
-output_characteristic = None
-input_characteristic = None
 nintendo_device_info = {}
-current_state = ControllerState.READ_INFO
-last_raw_data = None
+device_verdict_cache = {}
+scan_filter = False
+shm_enabled = False
+usb_enabled = False
+wired_enabled = False
+dsu_port = None
+dsu_server = None
+usb_enabler = None
+output_thread = None
+output_backend = 'vgamepad'
+uinput_path = "/dev/uinput"
+dolphin_pipe_dir = gc_dolphin.DEFAULT_PIPE_DIR
+hidraw_paths = []
+max_concurrent_connects = 3
+connect_timeout = 10.0
+# Seconds between scans while controllers are connected, None only scans again after one drops out
+rescan_interval = None
+adapter_names = []
+watchdog_budget = None
+profile_seconds = 10.0
+profile_dir = "."
+profiler = None
+hotkey_engine = None
+idle_timeout = IDLE_TIMEOUT
+# Sent when a controller goes into low-work mode, the normal report mode is requested again when it wakes
+idle_report_command = None
+# Running hotkey actions and report mode commands, so they aren't collected mid-way
+background_tasks = set()
+adapter_pool = None
+
+# Connected controllers by address, player slots and addresses we connected to before (most recent first)
+controllers = {}
+player_slots = {}
+known_addresses = []
+pairing_cache = {}
+host_bdaddr = None
 
-# Global reference to the current BLE client for rumble callback
-current_ble_client = None
+# Event loop running the BLE clients, for the rumble callback
 rumble_event_loop = None
+# HD (True) and GameCube (False) rumble frame tables
+rumble_encoders = {}
+# vgamepad module, imported when the first virtual pad is created
+vg = None
+# Decoded states and button edges for tools embedding the bridge, see gc_session.py
+session = Session()
+
+def load_vgamepad():
+    """Importing vgamepad connects to the driver, so it waits until a controller needs a virtual pad"""
+    global vg
+    if vg is None:
+        import vgamepad
+        XBOX_BUTTON_MAP.update({name: getattr(vgamepad.XUSB_BUTTON, button) for name, button in XBOX_BUTTON_NAMES.items()})
+        vg = vgamepad
+    return vg
 
 def handle_signal(signum, frame):
     global keep_running
     print("\nProgram is terminating...")
     keep_running = False
 
+def handle_profile_signal(signum, frame):
+    toggle_profiler()
+
+def toggle_profiler():
+    global profiler
+    if profiler is None:
+        profiler = SamplingProfiler(PROFILE_STAGES)
+        profiler.on_done = print_profile_summary
+    if profiler.running:
+        print("\n🔬 Stopping profiler...")
+        profiler.stop()
+        return
+    path = os.path.join(profile_dir, time.strftime("ns2_profile_%Y%m%d_%H%M%S.folded"))
+    profiler.start(profile_seconds, path)
+    print(f"\n🔬 Profiling for {profile_seconds:g} seconds...")
+
+def print_profile_summary(path, summary):
+    print(f"\n🔬 Profile written to {path} (collapsed stacks, e.g. flamegraph.pl {path} > profile.svg)")
+    for line in summary:
+        print(f"   {line}")
+
 def log_debug(message):
     if debug_mode:
         print(f"[DEBUG] {message}")
@@ -157,55 +397,84 @@ def log_debug(message):
 def log_verbose(message):
     print(f"[VERBOSE] {message}")
 
+def parse_nintendo_manufacturer_data(data):
+    if not data or len(data) < 6:
+        return None
+    if data[2] == 0x03 and data[3] == 0x7E:
+        product_id = (data[5] << 8) | data[4]
+        return (VENDOR_ID, NS2_PID_REMAP.get(product_id, product_id))
+    return None
+
 def extract_nintendo_info(manufacturer_data):
     if not manufacturer_data:
         return None
+    # Fast path: the controllers advertise under Nintendo's company ID
+    nintendo_info = parse_nintendo_manufacturer_data(manufacturer_data.get(NINTENDO_COMPANY_ID))
+    if nintendo_info:
+        return nintendo_info
     for company_id, data in manufacturer_data.items():
-        if not data or len(data) < 6:
-            continue
-        if len(data) >= 5 and data[2] == 0x03 and data[3] == 0x7E:
-            vendor_id = 0x057E
-            product_id = (data[5] << 8) | data[4] if len(data) > 5 else 0
-            return (vendor_id, product_id)
+        if company_id != NINTENDO_COMPANY_ID:
+            nintendo_info = parse_nintendo_manufacturer_data(data)
+            if nintendo_info:
+                return nintendo_info
     return None
 
-def is_nintendo_device(device):
+def guess_product_id_from_name(name):
+    lowered = name.lower()
+    if "(l)" in lowered:
+        return PRODUCT_ID_L
+    if "(r)" in lowered:
+        return PRODUCT_ID_R
+    return PRODUCT_ID_PRO
+
+def prune_device_verdict_cache():
+    now = time.monotonic()
+    for address in [address for address, (expires, _) in device_verdict_cache.items() if expires <= now]:
+        del device_verdict_cache[address]
+        # Advertisement info is only needed until we connect, a device that shows up again is judged anew
+        if address not in controllers:
+            nintendo_device_info.pop(address, None)
+
+def is_nintendo_device(device, advertisement_data=None):
     if not device:
         return False
-    name = device.name.lower() if device.name else ""
-    if name and any(
-            keyword in name for keyword in ["nintendo", "pro controller", "joy-con", "joy con", "joycon", "switch"]):
-        nintendo_device_info[device.address] = {
-            'vendor_id': VENDOR_ID,
-            'product_id': PRODUCT_ID_PRO,
-            'name': device.name
-        }
-        return True
-    if hasattr(device, "metadata") and device.metadata.get("manufacturer_data"):
-        nintendo_info = extract_nintendo_info(device.metadata["manufacturer_data"])
-        if nintendo_info:
-            pid = nintendo_info[1]
-            if pid == 0x7305:
-                pid = 0x2073
-            elif pid == 0x0920:
-                pid = 0x2009
-            elif pid == 0x0620:
-                pid = 0x2006
-            elif pid == 0x0720:
-                pid = 0x2007
-            nintendo_device_info[device.address] = {
-                'vendor_id': nintendo_info[0],
-                'product_id': pid,
-                'name': device.name
-            }
-            return True
-    return False
+    now = time.monotonic()
+    cached = device_verdict_cache.get(device.address)
+    if cached and cached[0] > now:
+        return cached[1]
+    if advertisement_data is not None:
+        name = device.name or advertisement_data.local_name
+        manufacturer_data = advertisement_data.manufacturer_data
+    else:
+        name = device.name
+        manufacturer_data = device.metadata.get("manufacturer_data") if hasattr(device, "metadata") else None
+    nintendo_info = extract_nintendo_info(manufacturer_data)
+    if nintendo_info:
+        vendor_id, pid = nintendo_info
+    elif name and NINTENDO_NAME_PATTERN.search(name):
+        vendor_id, pid = VENDOR_ID, guess_product_id_from_name(name)
+    else:
+        # Only remember a negative verdict once the advertisement had something to judge by,
+        # the name often only arrives with the scan response
+        if name or manufacturer_data:
+            device_verdict_cache[device.address] = (now + DEVICE_VERDICT_TTL, False)
+        return False
+    nintendo_device_info[device.address] = {
+        'vendor_id': vendor_id,
+        'product_id': pid,
+        'name': name,
+        'rssi': getattr(advertisement_data, 'rssi', None),
+    }
+    device_verdict_cache[device.address] = (now + DEVICE_VERDICT_TTL, True)
+    return True
 
 def get_nintendo_device_name(device):
     if device.address not in nintendo_device_info:
         return device.name or "Nintendo device"
     info = nintendo_device_info[device.address]
-    pid = info.get('product_id', 0)
+    return get_product_name(info.get('product_id', 0))
+
+def get_product_name(pid):
     if pid == PRODUCT_ID_PRO:
         return "Nintendo Switch Pro Controller"
     elif pid == PRODUCT_ID_L:
@@ -248,7 +517,7 @@ def print_raw_bytes(data):
     raw_str = " ".join([f"{b:02X}" for b in data[:16]])
     return f"Raw: {raw_str}"
 
-def update_xbox_gamepad(pressed_gc_buttons, L, R, LX, LY, RX, RY):
+def update_xbox_gamepad(gamepad, pressed_gc_buttons, L, R, LX, LY, RX, RY):
     gamepad.reset()
     for btn in pressed_gc_buttons:
         xb_btn = XBOX_BUTTON_MAP.get(btn)
@@ -261,6 +530,24 @@ def update_xbox_gamepad(pressed_gc_buttons, L, R, LX, LY, RX, RY):
     gamepad.right_joystick(x_value=RX, y_value=RY)  # values between -32768 and 32767
         
     gamepad.update()
+
+def write_xbox_gamepad(gamepad, state):
+    button_data, axes = state
+    update_xbox_gamepad(gamepad, get_pressed_buttons_gc(button_data), axes[4], axes[5], axes[0], axes[1], axes[2], axes[3])
+
+def write_uinput_gamepad(device, state):
+    button_data, axes = state
+    keys = lookup_buttons(UINPUT_KEY_TABLES, button_data)
+    hat_x = ((button_data >> SW2.RIGHT) & 1) - ((button_data >> SW2.LEFT) & 1)
+    hat_y = ((button_data >> SW2.DOWN) & 1) - ((button_data >> SW2.UP) & 1)
+    # evdev Y axes point down
+    device.write_state(keys, (axes[0], -axes[1], axes[2], -axes[3], axes[4], axes[5], hat_x, hat_y))
+
+def write_dolphin_pipe(pipe, state):
+    button_data, axes = state
+    quantize = gc_dolphin.quantize_stick
+    pipe.write_state(lookup_buttons(DOLPHIN_BUTTON_TABLES, button_data), quantize(axes[0]), quantize(axes[1]),
+                     quantize(axes[2]), quantize(axes[3]), axes[4], axes[5])
     
 def normalize_axis(value, min_val=746, center_val=1998, max_val=3249):
     if value >= center_val:
@@ -270,163 +557,385 @@ def normalize_axis(value, min_val=746, center_val=1998, max_val=3249):
         # Moving up → negative axis (-32768)
         return int(((value - center_val) / (center_val - min_val)) * 32768)
 
-async def notification_callback(sender, data):
-    global controller_state, last_raw_data
+def decode_stick_axes(data, offset, axes):
+    axes_data = data[offset:offset + 6]
+    axes[0] = normalize_axis(axes_data[0] | ((axes_data[1] & 0xF) << 8))  # LX
+    axes[1] = normalize_axis((axes_data[1] >> 4) | (axes_data[2] << 4))*-1  # LY
+    axes[2] = normalize_axis(axes_data[3] | ((axes_data[4] & 0xF) << 8))  # RX
+    axes[3] = normalize_axis((axes_data[4] >> 4) | (axes_data[5] << 4))*-1  # RY
+
+async def notification_callback(controller, sender, data):
     if not data or len(data) < 10:
         return
-    last_raw_data = data
-    pid = controller_state.get('product_id', PRODUCT_ID_PRO) if controller_state else PRODUCT_ID_PRO
+    controller['last_raw_data'] = data
+    controller['reports'] += 1
+    if controller['reports'] % gc_telemetry.TELEMETRY_SAMPLE_EVERY == 0:
+        sample_telemetry(controller, data)
+    idle = controller['idle']
+    if idle and idle.same_inputs(data[4:16] + data[60:62] if controller['product_id'] == PRODUCT_ID_GC else data[4:16]):
+        skip_idle_report(controller, data)
+        return
     if len(data) >= 8:
         button_data = int.from_bytes(data[4:8], byteorder='little')
     else:
         button_data = 0
     axes = [0, 0, 0, 0, 0, 0]
     if len(data) >= 16:
-        axes_data = data[10:16]
-        axes[0] = normalize_axis(axes_data[0] | ((axes_data[1] & 0xF) << 8))  # LX
-        axes[1] = normalize_axis((axes_data[1] >> 4) | (axes_data[2] << 4))*-1  # LY
-        axes[2] = normalize_axis(axes_data[3] | ((axes_data[4] & 0xF) << 8))  # RX
-        axes[3] = normalize_axis((axes_data[4] >> 4) | (axes_data[5] << 4))*-1  # RY
-    if pid == PRODUCT_ID_GC:
-        left_trigger, right_trigger = extract_gc_triggers(data)
-        axes[4] = left_trigger
-        axes[5] = right_trigger
+        decode_stick_axes(data, 10, axes)
+    if controller['product_id'] == PRODUCT_ID_GC:
+        axes[4], axes[5] = extract_gc_triggers(data)
+    if idle:
+        if not idle.changed(button_data, axes):
+            skip_idle_report(controller, data)
+            return
+        if idle.low_work:
+            wake_controller(controller)
+    motion = controller['imu'].decode(data) if controller['imu'] else None
+    dispatch_state(controller, button_data, axes, data, motion)
+
+def usb_report_callback(controller, data):
+    if len(data) < USB_REPORT_MIN_SIZE:
+        return
+    controller['last_raw_data'] = data
+    controller['reports'] += 1
+    if controller['reports'] % gc_telemetry.TELEMETRY_SAMPLE_EVERY == 0:
+        sample_telemetry(controller, None)
+    idle = controller['idle']
+    if idle and idle.same_inputs(data[3:15]):
+        skip_idle_report(controller, data)
+        return
+    button_data = USB_BUTTON_TABLES[0][data[3]] | USB_BUTTON_TABLES[1][data[4]] | USB_BUTTON_TABLES[2][data[5]]
+    axes = [0, 0, 0, 0, data[13], data[14]]
+    decode_stick_axes(data, 6, axes)
+    if idle:
+        if not idle.changed(button_data, axes):
+            skip_idle_report(controller, data)
+            return
+        if idle.low_work:
+            wake_controller(controller)
+    dispatch_state(controller, button_data, axes, data)
+
+def skip_idle_report(controller, data):
+    """
+    Buttons, sticks and triggers didn't change, only motion still goes out. A moving controller isn't idle,
+    one lying still in low-work mode only sends motion for every IDLE_MOTION_EVERY-th report
+    """
+    idle = controller['idle']
+    if controller['imu']:
+        motion = controller['imu'].decode(data)
+        if motion and not idle.still(motion):
+            if idle.low_work:
+                wake_controller(controller)
+            else:
+                idle.touch()
+        if not idle.low_work or controller['reports'] % IDLE_MOTION_EVERY == 0:
+            send_dsu_state(controller, idle.buttons, idle.axes, motion)
+    if idle.skip():
+        enter_low_work(controller)
+
+def enter_low_work(controller):
+    log_debug(f"P{controller['player']} idle for {idle_timeout:g}s, low-work mode")
+    if idle_report_command and controller['client']:
+        run_background(send_command(controller, idle_report_command))
+
+def wake_controller(controller):
+    controller['idle'].wake()
+    log_debug(f"P{controller['player']} active again")
+    if idle_report_command and controller['client']:
+        run_background(send_command(controller, build_init_step_command(controller, ControllerState.EN_REPORT)))
+
+def sample_telemetry(controller, data):
+    """Every TELEMETRY_SAMPLE_EVERY reports, data is None for reports without a battery reading"""
+    telemetry = controller['telemetry']
+    now = time.monotonic()
+    if telemetry['sampled_at']:
+        telemetry['report_rate'] = gc_telemetry.TELEMETRY_SAMPLE_EVERY / (now - telemetry['sampled_at'])
+    telemetry['sampled_at'] = now
+    millivolts = gc_telemetry.decode_battery_mv(data) if data else None
+    if millivolts:
+        telemetry['battery_mv'] = millivolts
+        telemetry['battery_percent'] = gc_telemetry.battery_percent(millivolts)
+        if telemetry['battery_percent'] <= gc_telemetry.BATTERY_LOW_PERCENT and not telemetry['battery_warned']:
+            telemetry['battery_warned'] = True
+            print(f"\n🪫 {controller['name']} (P{controller['player']}) battery low: {telemetry['battery_percent']}%")
+    session.set_telemetry(controller_telemetry(controller))
+
+def controller_telemetry(controller):
+    telemetry = controller['telemetry']
+    return Telemetry(
+        controller['address'], controller['player'], controller['name'], telemetry['battery_percent'], telemetry['battery_mv'],
+        telemetry['report_rate'], telemetry['rssi'], telemetry['serial'], telemetry['vendor_id'], telemetry['product_id'],
+        telemetry['sampled_at'],
+    )
+
+def print_status():
+    for controller in connected_controllers():
+        telemetry = controller_telemetry(controller)
+        battery = f"{telemetry.battery_percent}% ({telemetry.battery_mv / 1000:.2f} V)" if telemetry.battery_mv else "?"
+        rate = f"{telemetry.report_rate:.0f} reports/s" if telemetry.report_rate else "? reports/s"
+        rssi = f"{telemetry.rssi} dBm" if telemetry.rssi is not None else "?"
+        connection = "USB" if controller['hidraw'] else f"RSSI {rssi}" + (f" via {controller['adapter']}" if controller['adapter'] else "")
+        serial = f" | SN {telemetry.serial}" if telemetry.serial else ""
+        usb_id = f" | USB ID {telemetry.vendor_id:04X}:{telemetry.product_id:04X}" if telemetry.vendor_id is not None else ""
+        idle = " | 💤 idle" if controller['idle'] and controller['idle'].low_work else ""
+        print(f"\n📋 P{controller['player']} {controller['name']} | 🔋 {battery} | {rate} | {connection}{serial}{usb_id}{idle}")
+
+def send_dsu_state(controller, button_data, axes, motion):
+    imu = controller['imu']
+    if motion and not imu.calibrated():
+        # The uncorrected gyro would turn the emulator's view steadily, only the accelerometer goes out until the bias is known
+        motion = motion[:3] + (0.0, 0.0, 0.0)
+    dsu_buttons = lookup_buttons(DSU_BUTTON_TABLES, button_data)
+    l2 = axes[4] or (255 if button_data & (1 << SW2.ZL) else 0)
+    r2 = axes[5] or (255 if button_data & (1 << SW2.ZR) else 0)
+    dsu_server.send_pad_data(controller['dsu_slot'], dsu_buttons, button_data & (1 << SW2.HOME), axes, l2, r2, motion)
+
+def dispatch_state(controller, button_data, axes, data, motion=None):
+    """Output stage shared by the BLE and wired paths, takes an SW2 button word"""
+    hotkeys = controller['hotkeys']
+    if hotkeys and button_data != hotkeys.buttons:
+        hotkeys.update(button_data)
+    if session.active:
+        session.publish(controller['address'], controller['player'], controller['product_id'], button_data, axes)
+    if controller['dsu_slot'] is not None:
+        send_dsu_state(controller, button_data, axes, motion)
+    publisher = controller['publisher']
+    if publisher:
+        publisher.publish(button_data, axes)
+    if controller['product_id'] == PRODUCT_ID_GC:
+        if not controller['write_output']:
+            pass
+        elif output_thread:
+            output_thread.put(controller['address'], controller['write_output'], (button_data, axes))
+        else:
+            controller['write_output']((button_data, axes))
+    if not interactive:
+        return
+    if controller['product_id'] == PRODUCT_ID_GC:
         pressed = get_pressed_buttons_gc(button_data)
-        update_xbox_gamepad(pressed, axes[4], axes[5], axes[0], axes[1], axes[2], axes[3])
         btns_display = ", ".join(pressed) if pressed else "none"
         trigger_display = f" | L:{axes[4]:3d} R:{axes[5]:3d}"
         axes_display = f"LX:{axes[0]:3d} LY:{axes[1]:3d} RX:{axes[2]:3d} RY:{axes[3]:3d}"
         if debug_mode:
             raw_display = print_raw_bytes(data)
-            print(f"\r[GC] Buttons: {btns_display:<30} | Sticks: {axes_display} {trigger_display} | {raw_display}", end="")
+            print(f"\r[GC P{controller['player']}] Buttons: {btns_display:<30} | Sticks: {axes_display} {trigger_display} | {raw_display}", end="")
         else:
-            print(f"\r[GC] Buttons: {btns_display:<30} | Sticks: {axes_display} {trigger_display}", end="")
+            print(f"\r[GC P{controller['player']}] Buttons: {btns_display:<30} | Sticks: {axes_display} {trigger_display}", end="")
     else:
         pressed = get_pressed_buttons_switch(button_data)
         btns_display = ", ".join(pressed) if pressed else "none"
         axes_display = f"LX:{axes[0]:3d} LY:{axes[1]:3d} RX:{axes[2]:3d} RY:{axes[3]:3d}"
         if debug_mode:
             raw_display = print_raw_bytes(data)
-            print(f"\r[SW] Buttons: {btns_display:<30} | Axes: {axes_display} | {raw_display}", end="")
+            print(f"\r[SW P{controller['player']}] Buttons: {btns_display:<30} | Axes: {axes_display} | {raw_display}", end="")
         else:
-            print(f"\r[SW] Buttons: {btns_display:<30} | Axes: {axes_display}", end="")
+            print(f"\r[SW P{controller['player']}] Buttons: {btns_display:<30} | Axes: {axes_display}", end="")
 
-async def send_command(client, command, retry=3):
-    global output_characteristic
+async def send_command(controller, command, retry=3):
+    output_characteristic = controller['output_characteristic']
     if not output_characteristic:
         log_debug("No output characteristic found!")
         return False
     try:
         log_verbose(f"Sending command: {command.hex(' ')}")
-        await client.write_gatt_char(output_characteristic, command)
+        await controller['client'].write_gatt_char(output_characteristic, command)
         return True
     except Exception as e:
         if retry > 0:
             log_debug(f"Error sending (attempt {4 - retry}/3): {e}")
             await asyncio.sleep(0.1)
-            return await send_command(client, command, retry - 1)
+            return await send_command(controller, command, retry - 1)
         else:
             log_debug(f"Sending failed after 3 attempts: {e}")
             return False
 
-async def set_player_leds(client, player_num=1):
+def build_led_command(player_num):
     if player_num < 1 or player_num > 8:
         player_num = 1
     led_value = BT_HID_LED_DEV_ID_MAP[player_num - 1]
-    led_cmd = bytearray([
+    return bytearray([
         0x30, 0x01, 0x00, 0x30, 0x00, 0x08, 0x00, 0x00,
         led_value, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
     ])
-    return await send_command(client, led_cmd)
 
-async def set_rumble(client, on=True):
-    global rumble_counter
-    
-    # NS2 rumble format based on BlueRetro developer's specification
-    rumble_cmd = bytearray([
-        0x50,  # out[0] - NS2 rumble command identifier
-        0x50 | (rumble_counter & 0x0F),  # out[1] - 4 MSB set to 5 (0x50), 4 LSB are counter
-        0x01 if on else 0x00,  # out[2] - rumble state: 0x01 = on, 0x00 = off
-        0x00, 0x00, 0x00, 0x00, 0x00,  # Padding to match expected packet size
-    ])
-    
-    # Increment counter for next rumble command (wraps around 0-15)
-    rumble_counter = (rumble_counter + 1) & 0x0F
-    
-    log_verbose(f"Sending NS2 rumble command: {rumble_cmd.hex(' ')} (counter: {rumble_counter-1 & 0x0F}, state: {'ON' if on else 'OFF'})")
-    
-    return await send_command(client, rumble_cmd)
+async def set_player_leds(controller, player_num=1):
+    return await send_command(controller, build_led_command(player_num))
+
+def get_rumble_encoder(product_id):
+    # Frame tables are built the first time a controller of the kind connects
+    hd = product_id != PRODUCT_ID_GC
+    encoder = rumble_encoders.get(hd)
+    if encoder is None:
+        encoder = rumble_encoders[hd] = RumbleEncoder(hd)
+    return encoder
+
+def set_rumble(controller, large_motor, small_motor):
+    """XInput motor intensities (0-255) from the game, held back while a rumble sequence runs"""
+    controller['rumble_requested'] = (quantize_intensity(large_motor), quantize_intensity(small_motor))
+    task = controller['rumble_task']
+    if task is None or task.done():
+        apply_rumble_level(controller, controller['rumble_requested'])
+
+def apply_rumble_level(controller, level):
+    # The rumble streamer picks it up right away
+    if level != controller['rumble_level']:
+        controller['rumble_level'] = level
+        controller['rumble_wakeup'].set()
+
+async def write_rumble_frame(controller, frame):
+    # No retries, the next frame replaces this one anyway
+    try:
+        await controller['client'].write_gatt_char(controller['output_characteristic'], frame)
+    except Exception as e:
+        log_debug(f"Error sending rumble frame: {e}")
+
+async def rumble_streamer(controller):
+    """Repeats the current rumble frame every RUMBLE_REFRESH_INTERVAL while rumbling, sends one stop frame when it ends"""
+    encoder = get_rumble_encoder(controller['product_id'])
+    wakeup = controller['rumble_wakeup']
+    stopped = True
+    while True:
+        wakeup.clear()
+        large, small = controller['rumble_level']
+        if large or small or not stopped:
+            counter = controller['rumble_counter']
+            controller['rumble_counter'] = (counter + 1) & 0x0F
+            await write_rumble_frame(controller, encoder.frame(counter, large, small))
+            stopped = not (large or small)
+        if stopped:
+            await wakeup.wait()
+        else:
+            try:
+                await asyncio.wait_for(wakeup.wait(), RUMBLE_REFRESH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
 
 async def dump_raw_data():
-    global last_raw_data
-    if last_raw_data:
-        print("\n\nRaw data of the last report:")
-        print("---------------------------------")
-        for i in range(0, len(last_raw_data), 8):
-            group = last_raw_data[i:i + 8]
-            hex_values = " ".join([f"{b:02X}" for b in group])
-            ascii_values = "".join([chr(b) if 32 <= b <= 126 else "." for b in group])
-            print(f"{i:04X}: {hex_values:<24} | {ascii_values}")
-        print()
+    for controller in connected_controllers():
+        last_raw_data = controller['last_raw_data']
+        if last_raw_data:
+            print(f"\n\nRaw data of the last report (P{controller['player']} {controller['name']}):")
+            print("---------------------------------")
+            for i in range(0, len(last_raw_data), 8):
+                group = last_raw_data[i:i + 8]
+                hex_values = " ".join([f"{b:02X}" for b in group])
+                ascii_values = "".join([chr(b) if 32 <= b <= 126 else "." for b in group])
+                print(f"{i:04X}: {hex_values:<24} | {ascii_values}")
+            print()
 
-def async_rumble_handler(large_motor, small_motor):
-    """Handle rumble in async context"""
-    global current_ble_client, rumble_event_loop
-    
-    if not current_ble_client or not rumble_event_loop:
+def async_rumble_handler(controller, large_motor, small_motor):
+    """Handle rumble in async context, called from the vgamepad driver thread"""
+    if not controller['connected'] or not rumble_event_loop:
         log_debug("No BLE client or event loop available for rumble")
         return
     
     log_debug(f"Received rumble request - large: {large_motor}, small: {small_motor}")
     
-    if large_motor > 0 or small_motor > 0:
-        # Schedule the coroutine in the event loop running the BLE client
-        def run_rumble():
-            try:
-                future = asyncio.run_coroutine_threadsafe(
-                    perform_rumble_sequence(), rumble_event_loop
-                )
-                future.result(timeout=2.0)  # Wait up to 2 seconds
-            except Exception as e:
-                log_debug(f"Error scheduling rumble: {e}")
-        
-        # Run in a separate thread to avoid blocking
-        threading.Thread(target=run_rumble, daemon=True).start()
+    # Hand the intensities to the event loop running the BLE client, the streamer does the rest
+    rumble_event_loop.call_soon_threadsafe(set_rumble, controller, large_motor, small_motor)
 
-async def perform_rumble_sequence():
-    """Perform the actual rumble sequence"""
-    global current_ble_client
-    try:
-        if current_ble_client:
-            log_debug("Starting rumble sequence")
-            await set_rumble(current_ble_client, True)
-            await asyncio.sleep(0.2)  # Brief rumble duration
-            await set_rumble(current_ble_client, False)
-            log_debug("Rumble sequence completed")
-    except Exception as e:
-        log_debug(f"Error in rumble sequence: {e}")
+def start_rumble_sequence(controller, duration=0.2):
+    # A sequence that is still running isn't started again
+    task = controller['rumble_task']
+    if task and not task.done():
+        return task
+    controller['rumble_task'] = asyncio.create_task(perform_rumble_sequence(controller, duration))
+    return controller['rumble_task']
 
-def vgamepad_notification_callback(client, target, large_motor, small_motor, led_number, user_data):
-    """
-    Synchronous callback for vgamepad notifications.
-    This schedules async rumble handling.
-    """
-    async_rumble_handler(large_motor, small_motor)
+async def perform_rumble_sequence(controller, duration=0.2):
+    """Full rumble for duration seconds, then back to whatever the game asked for"""
+    if controller['connected']:
+        log_debug("Starting rumble sequence")
+        apply_rumble_level(controller, (RUMBLE_LEVELS - 1, RUMBLE_LEVELS - 1))
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            # Games only send rumble when it changes, theirs has to come back on its own
+            apply_rumble_level(controller, controller['rumble_requested'])
+        log_debug("Rumble sequence completed")
 
-def setup_vgamepad_callback():
+def setup_vgamepad_callback(controller):
     """Setup the vgamepad notification callback"""
+    def vgamepad_notification_callback(client, target, large_motor, small_motor, led_number, user_data):
+        """
+        Synchronous callback for vgamepad notifications.
+        This schedules async rumble handling.
+        """
+        async_rumble_handler(controller, large_motor, small_motor)
+
     try:
-        gamepad.register_notification(callback_function=vgamepad_notification_callback)
+        controller['gamepad'].register_notification(callback_function=vgamepad_notification_callback)
         log_debug("vgamepad notification callback registered successfully")
         return True
     except Exception as e:
         log_debug(f"Failed to register vgamepad callback: {e}")
         return False
-        
-async def handle_keyboard_input(client):
-    await set_rumble(client, True)
-    await asyncio.sleep(0.5)
-    await set_rumble(client, False)
+
+async def hotkey_exit(controller):
+    global keep_running
+    print("\n👋 Exit requested from the controller...")
+    keep_running = False
+
+async def hotkey_rumble(controller):
+    start_rumble_sequence(controller, 0.5)
+
+async def hotkey_debug(controller):
+    global debug_mode
+    debug_mode = not debug_mode
+    print(f"\nDebug mode {'enabled' if debug_mode else 'disabled'}")
+
+async def hotkey_verbose(controller):
+    global verbose_mode
+    verbose_mode = not verbose_mode
+    print(f"\nVerbose mode {'enabled' if verbose_mode else 'disabled'}")
+
+async def hotkey_raw(controller):
+    await dump_raw_data()
+
+async def hotkey_profile(controller):
+    toggle_profiler()
+
+async def hotkey_status(controller):
+    print_status()
+
+async def hotkey_repair(controller):
+    if not controller['client']:
+        return
+    print(f"\n🔁 Re-pairing {controller['name']} (P{controller['player']})...")
+    # Forget the cached pairing so the reconnect runs the full init
+    if pairing_cache.pop(controller['address'], None) is not None:
+        save_pairing_cache()
+    await controller['client'].disconnect()
+
+HOTKEY_ACTIONS = {
+    'exit': hotkey_exit,
+    'rumble': hotkey_rumble,
+    'debug': hotkey_debug,
+    'verbose': hotkey_verbose,
+    'raw': hotkey_raw,
+    'profile': hotkey_profile,
+    'status': hotkey_status,
+    'repair': hotkey_repair,
+}
+
+# Button names for --hotkey: SW2 names plus the names shown in the status line
+HOTKEY_BUTTON_NAMES = {
+    **{name.upper(): bit for bit, name in SWITCH_BUTTON_MAP.items()},
+    **{name.upper(): bit for bit, name in GC_BUTTON_MAP.items()},
+    **{button.name: int(button) for button in SW2},
+}
+
+def run_hotkey_action(controller, action):
+    # Actions run as their own tasks, input handling never waits for them
+    log_debug(f"Hotkey {action} on P{controller['player']}")
+    run_background(HOTKEY_ACTIONS[action](controller))
+
+def run_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+async def handle_keyboard_input():
     global debug_mode, verbose_mode, keep_running
     # This runs as a background task!
     while keep_running:
@@ -447,13 +956,13 @@ async def handle_keyboard_input(client):
                             if c:
                                 if c == 'r':
                                     print("\n🎮 Rumble test...")
-                                    await set_rumble(client, True)
-                                    await asyncio.sleep(0.5)
-                                    await set_rumble(client, False)
+                                    # Not awaited, a controller that leaves mid-pulse cancels its own sequence only
+                                    for controller in connected_controllers():
+                                        start_rumble_sequence(controller, 0.5)
                                 elif c >= '1' and c <= '8':
                                     player_num = int(c)
                                     print(f"\n💡 Set player LED to {player_num}...")
-                                    await set_player_leds(client, player_num)
+                                    await asyncio.gather(*(set_player_leds(controller, player_num) for controller in connected_controllers()))
                                 elif c == 'd':
                                     debug_mode = not debug_mode
                                     print(f"\nDebug mode {'enabled' if debug_mode else 'disabled'}")
@@ -462,6 +971,10 @@ async def handle_keyboard_input(client):
                                     print(f"\nVerbose mode {'enabled' if verbose_mode else 'disabled'}")
                                 elif c == 'x':
                                     await dump_raw_data()
+                                elif c == 'p':
+                                    toggle_profiler()
+                                elif c == 's':
+                                    print_status()
                         except IOError:
                             pass
                         await asyncio.sleep(0.1)
@@ -475,14 +988,18 @@ async def handle_keyboard_input(client):
             log_debug(f"Error in keyboard input: {e}")
             await asyncio.sleep(1)
 
-async def find_characteristics(client):
-    global output_characteristic, input_characteristic
+async def find_characteristics(controller):
+    input_characteristic = None
+    output_characteristic = None
+    reply_characteristics = []
     try:
-        services = await client.get_services()
+        services = await controller['client'].get_services()
         for service in services:
             if service.uuid.lower() == NINTENDO_SERVICE_UUID.lower():
                 for char in service.characteristics:
                     props = char.properties
+                    if "notify" in props and input_characteristic:
+                        reply_characteristics.append(char.uuid)
                     if "notify" in props and not input_characteristic:
                         input_characteristic = char.uuid
                     if ("write-without-response" in props or "write" in props) and not output_characteristic:
@@ -496,35 +1013,164 @@ async def find_characteristics(client):
                             input_characteristic = char.uuid
                         if ("write" in props or "write-without-response" in props) and not output_characteristic:
                             output_characteristic = char.uuid
+        controller['input_characteristic'] = input_characteristic
+        controller['output_characteristic'] = output_characteristic
+        controller['reply_characteristics'] = reply_characteristics
         return input_characteristic is not None and output_characteristic is not None
     except Exception as e:
         log_debug(f"Error finding characteristics: {e}")
         return False
 
-async def initialize_controller(client, device):
-    global current_state, controller_state, input_characteristic, output_characteristic, current_ble_client, rumble_event_loop
-    controller_info = nintendo_device_info.get(device.address, {})
-    pid = controller_info.get('product_id', PRODUCT_ID_PRO)
-    controller_state = {'product_id': pid, 'connected': True}
-    current_ble_client = client  # Store reference for rumble callback
-    rumble_event_loop = asyncio.get_event_loop()  # Store current event loop
-    
-    if not await find_characteristics(client):
-        print("❌ Could not find suitable characteristics.")
-        return False
-    print("⏳ Initializing controller...")
-    current_state = ControllerState.DONE
-    await client.start_notify(input_characteristic, notification_callback)
-    
-    # Setup vgamepad callback for rumble support
-    callback_success = setup_vgamepad_callback()
-    
-    print(f"✅ Controller successfully initialized! ({get_nintendo_device_name(device)})")
-    if callback_success:
-        print("🎮 Rumble callback registered - games should be able to rumble the controller!")
-    else:
-        print("⚠️ Rumble callback registration failed - manual rumble only")
-        
+def load_pairing_cache():
+    try:
+        with open(PAIRING_CACHE_FILE) as f:
+            pairing_cache.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable pairing cache {PAIRING_CACHE_FILE}: {e}")
+    # Most recently seen controllers get the first connection slots
+    known_addresses[:] = sorted(pairing_cache, key=lambda address: pairing_cache[address].get('last_seen', 0), reverse=True)
+
+def save_pairing_cache():
+    # The cache holds link keys: only readable by the user, and written aside then renamed so it's never half written
+    temp_path = f"{PAIRING_CACHE_FILE}.tmp"
+    try:
+        with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+            json.dump(pairing_cache, f, indent=2)
+        os.replace(temp_path, PAIRING_CACHE_FILE)
+    except Exception as e:
+        log_debug(f"Could not save pairing cache: {e}")
+
+def parse_bdaddr(value):
+    if not BDADDR_PATTERN.fullmatch(value):
+        raise argparse.ArgumentTypeError(f"'{value}' is not a Bluetooth address like 12:34:56:78:9A:BC")
+    return value
+
+def build_init_command(command, subcommand, payload):
+    return bytearray([command, 0x91, 0x01, subcommand, 0x00, len(payload), 0x00, 0x00]) + bytes(payload)
+
+def build_spi_read_command(address, size):
+    return build_init_command(SW2_CMD_READ_SPI, SW2_SUBCMD_READ_SPI, [size, 0x7E, 0x00, 0x00] + list(address.to_bytes(4, 'little')))
+
+def build_init_step_command(controller, state):
+    if state == ControllerState.READ_INFO:
+        return build_spi_read_command(SPI_DEVICE_INFO_ADDRESS, SPI_DEVICE_INFO_SIZE)
+    if state == ControllerState.READ_LTK:
+        return build_spi_read_command(SPI_LTK_ADDRESS, SPI_LTK_SIZE)
+    if state == ControllerState.SET_BDADDR:
+        if not host_bdaddr:
+            return None
+        # The controller wants the host address and the address minus one, both little endian
+        bdaddr = int(host_bdaddr.replace(":", ""), 16)
+        payload = [0x00, 0x02] + list(bdaddr.to_bytes(6, 'little')) + list(((bdaddr - 1) & 0xFFFFFFFFFFFF).to_bytes(6, 'little'))
+        return build_init_command(SW2_CMD_PAIRING, SW2_SUBCMD_SET_BDADDR, payload)
+    if state == ControllerState.READ_NEW_LTK:
+        if not host_bdaddr:
+            return None
+        return build_init_command(SW2_CMD_PAIRING, SW2_SUBCMD_READ_LTK, [0x00])
+    if state == ControllerState.SET_LED:
+        return build_led_command(controller['player'])
+    if state == ControllerState.EN_REPORT:
+        return build_init_command(SW2_CMD_INIT, SW2_SUBCMD_ENABLE_REPORT, [0x01, 0x00, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF])
+    return None
+
+def reply_key(data):
+    """SPI reads are told apart by the address the reply echoes, other commands by command and subcommand"""
+    if data[0] == SW2_CMD_READ_SPI and data[3] == SW2_SUBCMD_READ_SPI:
+        return (data[0], data[3], bytes(data[SPI_READ_ADDRESS_OFFSET:SPI_READ_ADDRESS_OFFSET + 4]))
+    return (data[0], data[3])
+
+def reply_callback(controller, sender, data):
+    if not data or len(data) < 4:
+        return
+    # Replies with the same key come back in the order the commands were sent
+    waiters = controller['pending_replies'].get(reply_key(data))
+    while waiters:
+        future = waiters.popleft()
+        if not future.done():
+            future.set_result(bytes(data))
+            break
+
+async def run_init_step(controller, state):
+    command = build_init_step_command(controller, state)
+    if command is None:
+        log_debug(f"Skipping {state.name}")
+        return None
+    key = reply_key(command)
+    future = asyncio.get_running_loop().create_future()
+    waiters = controller['pending_replies'].setdefault(key, deque())
+    waiters.append(future)
+    try:
+        if not await send_command(controller, command):
+            return None
+        reply = await asyncio.wait_for(future, timeout=INIT_REPLY_TIMEOUT)
+        # Past the header and the echoed arguments
+        return reply[len(command):]
+    except asyncio.TimeoutError:
+        log_debug(f"No reply to {state.name} within {INIT_REPLY_TIMEOUT:.1f}s")
+        return None
+    finally:
+        if future in waiters:
+            waiters.remove(future)
+
+async def run_init_state_machine(controller):
+    """Drive the controller through ControllerState, returns True for a warm reconnect"""
+    cached = pairing_cache.get(controller['address'], {})
+    # Entries with a longer LTK were cached with the echoed read arguments in front and have to be read again
+    warm = bool(cached.get('device_info') and len(cached.get('ltk', "")) == 2 * SPI_LTK_SIZE)
+    if warm:
+        controller['device_info'] = bytes.fromhex(cached['device_info'])
+        controller['ltk'] = bytes.fromhex(cached['ltk'])
+    # Only a controller that handed out the LTK for this host is cached as bonded, otherwise the next
+    # connection has to go through the pairing steps again
+    paired = False
+    for stage in INIT_SEQUENCE_WARM if warm else INIT_SEQUENCE_COLD:
+        controller['state'] = stage[0]
+        replies = await asyncio.gather(*(run_init_step(controller, state) for state in stage))
+        for state, payload in zip(stage, replies):
+            if payload is None:
+                continue
+            if state == ControllerState.READ_INFO and len(payload) >= SPI_DEVICE_INFO_SIZE:
+                controller['device_info'] = payload[:SPI_DEVICE_INFO_SIZE]
+            elif state in (ControllerState.READ_LTK, ControllerState.READ_NEW_LTK) and len(payload) >= SPI_LTK_SIZE:
+                controller['ltk'] = payload[:SPI_LTK_SIZE]
+                paired = paired or state == ControllerState.READ_NEW_LTK
+    controller['state'] = ControllerState.DONE
+    if not warm and paired and controller['device_info']:
+        cached.update({
+            'product_id': controller['product_id'],
+            'device_info': controller['device_info'].hex(),
+            'ltk': controller['ltk'].hex(),
+        })
+    cached['last_seen'] = time.time()
+    pairing_cache[controller['address']] = cached
+    save_pairing_cache()
+    return warm
+
+def connected_controllers():
+    return [controller for controller in controllers.values() if controller['connected']]
+
+def assign_player_slot(address):
+    taken = {controller['player'] for controller in controllers.values()}
+    if usb_enabler:
+        # Wired controllers the USB enabler lit up keep their LED's player for when their hidraw node opens
+        taken.update(entry['player'] for entry in usb_enabler.devices.values())
+    previous = player_slots.get(address)
+    if previous and previous not in taken:
+        return previous
+    player = next((slot for slot in range(1, MAX_PLAYERS + 1) if slot not in taken), MAX_PLAYERS)
+    player_slots[address] = player
+    return player
+
+def remember_known_address(address):
+    if address in known_addresses:
+        known_addresses.remove(address)
+    known_addresses.insert(0, address)
+
+def print_interactive_help():
+    if not interactive:
+        return
     print("\n📊 Receiving controller data...")
     print("📍 Move sticks and press buttons to see the data...")
     print("   - Press Ctrl+C to quit")
@@ -533,43 +1179,292 @@ async def initialize_controller(client, device):
     print("   - d: Toggle debug mode")
     print("   - v: Toggle verbose mode")
     print("   - x: Show raw data (byte values)")
-    if callback_success:
-        print("   - Rumble from games should work automatically!")
+    print(f"   - p: Profile for {profile_seconds:g} seconds")
+    print("   - s: Show battery, report rate and signal")
+
+async def initialize_controller(controller):
+    client = controller['client']
+    
+    if not await find_characteristics(controller):
+        print("❌ Could not find suitable characteristics.")
+        return False
+    print(f"⏳ Initializing {controller['name']}...")
+    for reply_characteristic in controller['reply_characteristics']:
+        await client.start_notify(reply_characteristic, functools.partial(reply_callback, controller))
+    if await run_init_state_machine(controller):
+        print("⚡ Known controller, skipped pairing steps")
+    device_info = gc_telemetry.parse_device_info(controller['device_info'])
+    controller['telemetry'].update(device_info)
+    if device_info['serial']:
+        print(f"🏷️  Serial number {device_info['serial']}")
+    session.set_telemetry(controller_telemetry(controller))
+    start_output(controller)
+    controller['rumble_streamer'] = asyncio.create_task(rumble_streamer(controller))
+    await client.start_notify(controller['input_characteristic'], functools.partial(notification_callback, controller))
     
-    # Start the keyboard handler as a background task!
-    asyncio.create_task(handle_keyboard_input(client))
+    print(f"✅ Controller successfully initialized as player {controller['player']}! ({controller['name']})")
+    # Only vgamepad pads pass the game's rumble on, the other backends have no callback to register
+    if output_backend == 'vgamepad' and controller['gamepad']:
+        if setup_vgamepad_callback(controller):
+            print("🎮 Rumble callback registered - games should be able to rumble the controller!")
+        else:
+            print("⚠️ Rumble callback registration failed - manual rumble only")
     return True
 
-async def connect_to_device(device):
-    global controller_state, current_ble_client, rumble_event_loop
+def usb_player_slot(info):
+    """The USB enabler asks for the player LED of a controller it's enabling, keyed by its USB device"""
+    return assign_player_slot(info['key'])
+
+def create_controller(address, name, product_id, player=None):
+    controller = {
+        'address': address,
+        'name': name,
+        'product_id': product_id,
+        'connected': False,
+        'client': None,
+        'input_characteristic': None,
+        'output_characteristic': None,
+        'reply_characteristics': [],
+        'pending_replies': {},
+        'device_info': None,
+        'ltk': None,
+        'state': ControllerState.READ_INFO,
+        'player': player or assign_player_slot(address),
+        'gamepad': None,
+        'write_output': None,
+        'publisher': None,
+        'rumble_counter': 0,
+        'rumble_level': (0, 0),
+        # Level the game asked for, rumble_level is what is being sent
+        'rumble_requested': (0, 0),
+        'rumble_wakeup': asyncio.Event(),
+        'rumble_streamer': None,
+        'rumble_task': None,
+        'hotkeys': None,
+        'idle': None,
+        'last_raw_data': None,
+        'hidraw': None,
+        'imu': None,
+        'dsu_slot': None,
+        'adapter': None,
+        'reports': 0,
+        'telemetry': gc_telemetry.create_telemetry(),
+    }
+    controllers[address] = controller
+    return controller
+
+def start_output(controller):
+    if shm_enabled:
+        try:
+            from gc_shm import StatePublisher
+            controller['publisher'] = StatePublisher(controller['address'], controller['product_id'])
+            print(f"🧠 Publishing controller state to shared memory: {controller['publisher'].name}")
+        except Exception as e:
+            print(f"⚠️ Shared memory publishing unavailable: {e}")
+    if hotkey_engine:
+        controller['hotkeys'] = hotkey_engine.matcher(functools.partial(run_hotkey_action, controller))
+    if idle_timeout:
+        controller['idle'] = IdleDetector(idle_timeout)
+    if output_backend == 'none' or controller['product_id'] != PRODUCT_ID_GC:
+        # Only GameCube controllers are mapped to a virtual pad, a dead pad would take a player slot in games
+        pass
+    elif output_backend == 'uinput':
+        controller['gamepad'] = gc_uinput.UinputGamepad(f"NS2 {controller['name']} P{controller['player']}", uinput_path)
+        controller['write_output'] = functools.partial(write_uinput_gamepad, controller['gamepad'])
+    elif output_backend == 'dolphin':
+        pipe_path = os.path.join(dolphin_pipe_dir, f"ns2_p{controller['player']}")
+        controller['gamepad'] = gc_dolphin.DolphinPipe(pipe_path)
+        controller['write_output'] = functools.partial(write_dolphin_pipe, controller['gamepad'])
+        print(f"🐬 Dolphin pipe for player {controller['player']}: {pipe_path}")
+    else:
+        controller['gamepad'] = load_vgamepad().VX360Gamepad()
+        controller['write_output'] = functools.partial(write_xbox_gamepad, controller['gamepad'])
+    if dsu_server and controller['player'] <= gc_motion.DSU_SLOTS:
+        controller['dsu_slot'] = controller['player'] - 1
+        connection_type = gc_motion.DSU_CONNECTION_USB if controller['hidraw'] else gc_motion.DSU_CONNECTION_BLUETOOTH
+        dsu_server.connect_slot(controller['dsu_slot'], controller['address'], connection_type)
+        if controller['product_id'] != PRODUCT_ID_GC and not controller['hidraw']:
+            controller['imu'] = gc_motion.ImuDecoder(IMU_REPORT_OFFSET)
+
+def stop_output(controller):
+    if controller['publisher']:
+        controller['publisher'].close()
+        controller['publisher'] = None
+    if controller['dsu_slot'] is not None:
+        dsu_server.disconnect_slot(controller['dsu_slot'])
+        controller['dsu_slot'] = None
+    controller['imu'] = None
+    for key in ('rumble_task', 'rumble_streamer'):
+        if controller[key]:
+            controller[key].cancel()
+            controller[key] = None
+    if controller['hotkeys']:
+        controller['hotkeys'].reset()
+        controller['hotkeys'] = None
+    controller['idle'] = None
+    session.forget(controller['address'])
+    controller['write_output'] = None
+    if output_backend in ('uinput', 'dolphin') and controller['gamepad']:
+        if output_thread:
+            output_thread.close(controller['address'], controller['gamepad'].close)
+        else:
+            controller['gamepad'].close()
+    elif output_thread:
+        output_thread.discard(controller['address'])
+    controller['gamepad'] = None
+
+def open_wired_controller(path, product_id):
+    name = f"{get_product_name(product_id)} (USB)"
+    player = usb_enabler.player_of(hidraw_usb_path(path)) if usb_enabler else None
+    controller = create_controller(path, name, product_id, player)
+    try:
+        reader = HidrawReader(path, functools.partial(usb_report_callback, controller), functools.partial(close_wired_controller, controller))
+    except OSError as e:
+        controllers.pop(path, None)
+        print(f"❌ Could not open {path}: {e}")
+        return None
+    controller['hidraw'] = reader
+    start_output(controller)
+    controller['connected'] = True
+    reader.start(asyncio.get_running_loop())
+    print(f"✅ Wired {name} on {path} ready as player {controller['player']}!")
+    if len(connected_controllers()) == 1:
+        print_interactive_help()
+    return controller
+
+def close_wired_controller(controller):
+    controller['connected'] = False
+    controllers.pop(controller['address'], None)
+    stop_output(controller)
+    print(f"\n🔌 {controller['name']} (P{controller['player']}) disconnected.")
+
+def open_wired_controllers():
+    for path in hidraw_paths:
+        if path not in controllers:
+            open_wired_controller(path, PRODUCT_ID_GC)
+    if wired_enabled and platform.system() == "Linux":
+        for path, product_id in find_hidraw_devices(VENDOR_ID, USB_WIRED_PRODUCT_IDS):
+            if path not in controllers:
+                open_wired_controller(path, product_id)
+
+def start_hidraw_monitor(loop, monitor=None):
+    """Wired controllers are opened as soon as udev announces their hidraw node instead of on the next scan"""
+    try:
+        monitor = monitor or HidrawHotplugMonitor()
+    except Exception as e:
+        log_debug(f"No hidraw hotplug events ({e}), wired controllers are picked up between scans")
+        return None
+    loop.add_reader(monitor.fileno(), on_hidraw_hotplug, monitor)
+    return monitor
+
+def on_hidraw_hotplug(monitor):
+    # Removal is noticed by the controller's HidrawReader
+    if any(action == 'add' for action, node in monitor.read_events()):
+        open_wired_controllers()
+
+def sample_adapter_load():
+    """Report rates of the BLE controllers, sampled before every scan so a connect finds them measured"""
+    for other in connected_controllers():
+        if not other['hidraw']:
+            adapter_pool.sample(other['address'], other['reports'])
+
+def choose_adapter(controller, sightings):
+    """Connect through the least loaded adapter that saw the controller, decided again on every reconnect"""
+    sample_adapter_load()
+    controller['adapter'] = adapter_pool.assign(controller['address'], list(sightings))
+    if len(adapter_pool.adapters) > 1:
+        log_debug(f"Adapter load: {adapter_pool.describe()}")
+    return sightings.get(controller['adapter']) or next(iter(sightings.values()))
+
+async def connect_and_initialize(controller):
+    # One deadline covers both, --connect-timeout is the whole time until the controller streams
+    await controller['client'].connect()
+    print(f"✅ Connected to {controller['name']}!")
+    return await initialize_controller(controller)
+
+async def connect_to_device(sightings, connect_slots):
+    """sightings maps each adapter that saw the controller to its device there"""
+    device = next(iter(sightings.values()))
     device_name = get_nintendo_device_name(device)
-    print(f"\n🔄 Connecting to {device_name} ({device.address})...")
+    controller_info = nintendo_device_info.get(device.address, {})
+    controller = create_controller(device.address, device_name, controller_info.get('product_id', PRODUCT_ID_PRO))
+    controller['telemetry']['rssi'] = controller_info.get('rssi')
+    device = choose_adapter(controller, sightings)
+    adapter_display = f" on {controller['adapter']}" if controller['adapter'] else ""
+    print(f"\n🔄 Connecting to {device_name} ({device.address}){adapter_display}...")
+    client = adapter_pool.backend.client(device, controller['adapter'])
+    controller['client'] = client
     try:
-        async with BleakClient(device) as client:
-            print(f"✅ Connected to {device_name}!")
-            if await initialize_controller(client, device):
-                while keep_running and client.is_connected:
-                    await asyncio.sleep(0.1)
-                print("\n🔌 Controller disconnected.")
-            else:
-                print(f"❌ Controller initialization failed.")
+        # Only connection setup counts against the adapter's limit, streaming controllers don't hold a slot
+        async with connect_slots[controller['adapter']]:
+            initialized = await asyncio.wait_for(connect_and_initialize(controller), timeout=connect_timeout)
+        if initialized:
+            controller['connected'] = True
+            remember_known_address(device.address)
+            if len(connected_controllers()) == 1:
+                print_interactive_help()
+            start_rumble_sequence(controller, 0.5)
+            while keep_running and client.is_connected:
+                await asyncio.sleep(0.1)
+            print(f"\n🔌 {device_name} (P{controller['player']}) disconnected.")
+        else:
+            print(f"❌ Controller initialization failed.")
+    except asyncio.TimeoutError:
+        print(f"❌ Connecting to {device_name} timed out after {connect_timeout:.0f} seconds.")
     except Exception as e:
         print(f"❌ Connection error: {e}")
-        controller_state = None
     finally:
-        current_ble_client = None  # Clear reference when disconnected
-        rumble_event_loop = None   # Clear event loop reference
+        controller['connected'] = False
+        try:
+            await client.disconnect()
+        except Exception as e:
+            log_debug(f"Error disconnecting: {e}")
+        controllers.pop(device.address, None)
+        adapter_pool.release(device.address)
+        stop_output(controller)
+
+def connect_to_devices(devices, connect_slots):
+    """
+    Connect to all new controllers at once, previously known addresses get the first connection slots.
+    Controllers only few adapters can reach pick their adapter first, the rest fill in around them.
+    """
+    new_devices = {address: sightings for address, sightings in devices.items() if address not in controllers}
+    order = sorted(new_devices, key=lambda address: (
+        known_addresses.index(address) if address in known_addresses else len(known_addresses),
+        len(new_devices[address]),
+    ))
+    return [asyncio.create_task(connect_to_device(new_devices[address], connect_slots)) for address in order]
+
+async def scan_for_nintendo_devices(quiet=False):
+    if not quiet:
+        print("\n🔍 Searching for Nintendo Switch controllers (5 seconds)...")
+    prune_device_verdict_cache()
+    # address -> {adapter: device}, BlueZ devices belong to the adapter that saw them
+    nintendo_devices = {}
+
+    def detection_callback(adapter, device, advertisement_data):
+        sightings = nintendo_devices.get(device.address)
+        if sightings is not None:
+            sightings.setdefault(adapter, device)
+            # Keep the strongest signal any adapter sees
+            info = nintendo_device_info.get(device.address)
+            rssi = getattr(advertisement_data, 'rssi', None)
+            if info and rssi is not None and (info['rssi'] is None or rssi > info['rssi']):
+                info['rssi'] = rssi
+        elif is_nintendo_device(device, advertisement_data):
+            nintendo_devices[device.address] = {adapter: device}
+            print(f"✅ Nintendo device found: {get_nintendo_device_name(device)} ({device.address})")
+
+    async def scan_adapter(adapter):
+        # Let the backend drop everything that doesn't advertise the Nintendo service (BlueZ, CoreBluetooth, WinRT)
+        scanner_kwargs = {'service_uuids': [NINTENDO_SERVICE_UUID]} if scan_filter else {}
+        async with adapter_pool.backend.scanner(functools.partial(detection_callback, adapter), adapter, **scanner_kwargs):
+            await asyncio.sleep(5.0)
 
-async def scan_for_nintendo_devices():
-    print("\n🔍 Searching for Nintendo Switch controllers (5 seconds)...")
     try:
-        devices = await BleakScanner.discover(timeout=5.0)
-        nintendo_devices = []
-        for device in devices:
-            if is_nintendo_device(device):
-                nintendo_devices.append(device)
-                print(f"✅ Nintendo device found: {get_nintendo_device_name(device)} ({device.address})")
-        if not nintendo_devices:
+        # All adapters scan at the same time, a controller seen by several can go to either
+        await asyncio.gather(*(scan_adapter(adapter) for adapter in adapter_pool.adapters))
+        if not nintendo_devices and not quiet:
             print("❌ No Nintendo Switch controllers found.")
             print("\n📌 Make sure that:")
             print("   1. The controller is in pairing mode (LEDs blinking)")
@@ -578,29 +1473,81 @@ async def scan_for_nintendo_devices():
         return nintendo_devices
     except Exception as e:
         print(f"❌ Error scanning: {e}")
-        return []
+        return {}
 
 async def main():
+    global rumble_event_loop, dsu_server, output_thread, adapter_pool, usb_enabler
     print("\n🎮 NS2 Bluetooth Enabler (Python) v1.5")
     print("======================================")
     print(f"🖥️  Platform: {platform.system()} {platform.release()}")
     print(f"🐍 Python: {platform.python_version()}")
     print("\nThis tool detects and monitors Nintendo Switch 2 controllers via Bluetooth.")
     print("Supports Pro Controller, Joy-Con and GameCube Controller.\n")
-    signal.signal(signal.SIGINT, handle_signal)
-    signal.signal(signal.SIGTERM, handle_signal)
+    if interactive:
+        signal.signal(signal.SIGINT, handle_signal)
+        signal.signal(signal.SIGTERM, handle_signal)
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, handle_profile_signal)
     print("📋 Pairing instructions:")
     print("1. Put your controller in pairing mode:")
     print("   - Pro Controller: Hold the small pairing button on the top")
     print("   - Joy-Con: Hold pairing button on the side")
     print("   - GameCube Controller: Hold pairing button on the top")
     print("2. Make sure the controller is not already connected to another device.\n")
+    rumble_event_loop = asyncio.get_running_loop()
+    load_pairing_cache()
+    if adapter_pool is None:
+        adapters = find_bluez_adapters() if adapter_names == ['all'] else adapter_names
+        adapter_pool = AdapterPool(adapters)
+        if len(adapter_pool.adapters) > 1:
+            print(f"📡 Spreading controllers over {len(adapter_pool.adapters)} adapters: {', '.join(adapter_pool.adapters)}")
+    # vgamepad calls can block in the driver, they run on their own thread
+    output_thread = OutputThread()
+    output_thread.on_error = lambda e: log_debug(f"Error updating virtual gamepad: {e}")
+    output_thread.start()
+    if dsu_port:
+        try:
+            dsu_server = gc_motion.DsuServer()
+            await dsu_server.start(port=dsu_port)
+            print(f"🌀 DSU motion server listening on 127.0.0.1:{dsu_port}")
+        except Exception as e:
+            print(f"⚠️ DSU server unavailable: {e}")
+            dsu_server = None
+    if usb_enabled:
+        try:
+            from gc_usb_enabler import UsbEnabler
+            usb_enabler = UsbEnabler(player_for=usb_player_slot)
+            await usb_enabler.start()
+            print("🔌 Enabling wired controllers as they are plugged in.")
+        except Exception as e:
+            print(f"⚠️ USB enabler unavailable (needs Linux, pyusb and pyudev): {e}")
+            usb_enabler = None
+    hidraw_monitor = None
+    if wired_enabled and platform.system() == "Linux":
+        hidraw_monitor = start_hidraw_monitor(asyncio.get_running_loop())
+    # Connection setup is limited per adapter
+    watchdog = watchdog_task = None
+    if watchdog_budget:
+        watchdog = LoopWatchdog(watchdog_budget / 1000)
+        watchdog.on_slow = lambda name, elapsed: log_debug(f"Slow callback: {name} took {elapsed * 1000:.1f} ms")
+        watchdog.install()
+        watchdog_task = asyncio.create_task(watchdog.run())
+        print(f"⏱️  Watching event loop lag, callback budget {watchdog_budget:g} ms")
+    connect_slots = {adapter: asyncio.Semaphore(max_concurrent_connects) for adapter in adapter_pool.adapters}
+    keyboard_task = asyncio.create_task(handle_keyboard_input()) if interactive else None
+    connection_tasks = set()
     while keep_running:
         try:
-            nintendo_devices = await scan_for_nintendo_devices()
-            if nintendo_devices:
-                await connect_to_device(nintendo_devices[0])
-            if keep_running:
+            open_wired_controllers()
+            if len(controllers) < MAX_PLAYERS:
+                sample_adapter_load()
+                nintendo_devices = await scan_for_nintendo_devices(quiet=bool(controllers))
+                connection_tasks.update(connect_to_devices(nintendo_devices, connect_slots))
+            if connection_tasks:
+                # Scanning competes with the connected controllers' connection events, only rescan when one drops out
+                # unless --rescan-interval asks for it
+                _, connection_tasks = await asyncio.wait(connection_tasks, timeout=rescan_interval, return_when=asyncio.FIRST_COMPLETED)
+            elif keep_running:
                 print("\n⏳ Waiting 5 seconds before next scan...")
                 for i in range(5, 0, -1):
                     if keep_running:
@@ -612,15 +1559,128 @@ async def main():
         except Exception as e:
             print(f"❌ Error: {e}")
             await asyncio.sleep(2)
+    if connection_tasks:
+        await asyncio.gather(*connection_tasks, return_exceptions=True)
+    for controller in connected_controllers():
+        if controller['hidraw']:
+            controller['hidraw'].close()
+    if keyboard_task:
+        keyboard_task.cancel()
+    if usb_enabler:
+        usb_enabler.stop()
+        usb_enabler = None
+    if hidraw_monitor:
+        asyncio.get_running_loop().remove_reader(hidraw_monitor.fileno())
+    if dsu_server:
+        dsu_server.close()
+    output_thread.stop()
+    if watchdog:
+        watchdog_task.cancel()
+        watchdog.uninstall()
+        print()
+        for line in watchdog.report():
+            print(f"⏱️  {line}")
+    log_debug(f"Virtual gamepad updates: {output_thread.written} written, {output_thread.coalesced} superseded, {output_thread.errors} failed")
     print("\n👋 Program ended.")
 
-if __name__ == "__main__":
+def build_parser():
     parser = argparse.ArgumentParser(description='NS2 Bluetooth Enabler (Python)')
     parser.add_argument('-d', '--debug', action='store_true', help='Enable debug output')
     parser.add_argument('-v', '--verbose', action='store_true', help='Enable verbose output')
-    args = parser.parse_args()
+    parser.add_argument('--scan-filter', action='store_true', help='Only scan for devices advertising the Nintendo service')
+    parser.add_argument('--host-bdaddr', type=parse_bdaddr, help='Bluetooth address of this host, enables the pairing steps of the controller init')
+    parser.add_argument('--usb', action='store_true', help='Also enable wired controllers when they are plugged in (Linux)')
+    parser.add_argument('--wired', action='store_true', help='Also read wired GameCube controllers through hidraw (Linux)')
+    parser.add_argument('--hidraw', action='append', default=[], metavar='PATH', help='Read a wired controller from this hidraw node (or pipe/pty), can be repeated')
+    parser.add_argument('--dsu', nargs='?', type=int, const=gc_motion.DSU_DEFAULT_PORT, metavar='PORT', help=f'Serve motion and controller state to emulators over the DSU (cemuhook) protocol (default port: {gc_motion.DSU_DEFAULT_PORT})')
+    parser.add_argument('--output', choices=['vgamepad', 'uinput', 'dolphin', 'none'], default='vgamepad', help='Virtual pad backend (default: vgamepad, uinput and dolphin are Linux only, none only feeds --shm, --dsu and the library API)')
+    parser.add_argument('--uinput-path', default="/dev/uinput", help='uinput device node for --output uinput')
+    parser.add_argument('--dolphin-pipes', default=gc_dolphin.DEFAULT_PIPE_DIR, help='Dolphin pipe directory for --output dolphin')
+    parser.add_argument('--shm', action='store_true', help='Publish controller state to shared memory for local tools')
+    parser.add_argument('--adapter', action='append', default=[], metavar='HCI', help='Bluetooth adapter to use (BlueZ, e.g. hci1), repeat it or pass "all" to spread controllers over several adapters')
+    parser.add_argument('--watchdog', nargs='?', type=float, const=10.0, metavar='MS', help='Measure event loop lag and report callbacks running longer than MS milliseconds on exit (default: 10)')
+    parser.add_argument('--profile-seconds', type=float, default=10.0, help='How long a profile started with p or SIGUSR1 runs (default: 10)')
+    parser.add_argument('--profile-dir', default=".", help='Where profiles are written (default: current directory)')
+    parser.add_argument('--hotkey', action='append', default=[], metavar='SPEC', help=f'Controller hotkey, HOME+PLUS=exit, HOME+PLUS:2=exit (held 2 s) or UP,UP,DOWN=rumble (sequence), can be repeated. Actions: {", ".join(HOTKEY_ACTIONS)}')
+    parser.add_argument('--idle-timeout', type=float, default=IDLE_TIMEOUT, metavar='S', help=f'Seconds without input before a controller goes into low-work mode, 0 processes every report (default: {IDLE_TIMEOUT:g})')
+    parser.add_argument('--idle-report-command', metavar='HEX', help='Command sent to a controller going into low-work mode, e.g. a slower report mode, as hex bytes')
+    parser.add_argument('--max-concurrent-connects', type=int, default=3, help='Controllers to connect at the same time (default: 3)')
+    parser.add_argument('--connect-timeout', type=float, default=10.0, help='Seconds allowed for connecting and initializing a controller (default: 10)')
+    parser.add_argument('--rescan-interval', type=float, default=0.0, metavar='S', help='Also scan every S seconds while controllers are connected, to pick up newly powered-on ones. Scanning lowers the report rate of connected controllers (default: 0, only after one drops out)')
+    return parser
+
+def configure(args):
+    """Takes the options over from parsed arguments, raises ValueError for options that don't parse"""
+    global debug_mode, verbose_mode, shm_enabled, usb_enabled, wired_enabled, hidraw_paths, dsu_port, output_backend
+    global uinput_path, dolphin_pipe_dir, scan_filter, max_concurrent_connects, connect_timeout, adapter_names
+    global watchdog_budget, profile_seconds, profile_dir, idle_timeout, idle_report_command, hotkey_engine, host_bdaddr
+    global rescan_interval
     debug_mode = args.debug
     verbose_mode = args.verbose
+    shm_enabled = args.shm
+    usb_enabled = args.usb
+    wired_enabled = args.wired
+    hidraw_paths = list(args.hidraw)
+    dsu_port = args.dsu
+    output_backend = args.output
+    uinput_path = args.uinput_path
+    dolphin_pipe_dir = args.dolphin_pipes
+    scan_filter = args.scan_filter
+    max_concurrent_connects = max(1, args.max_concurrent_connects)
+    connect_timeout = args.connect_timeout
+    rescan_interval = args.rescan_interval if args.rescan_interval > 0 else None
+    adapter_names = list(args.adapter)
+    watchdog_budget = args.watchdog
+    profile_seconds = args.profile_seconds
+    profile_dir = args.profile_dir
+    idle_timeout = max(0.0, args.idle_timeout)
+    idle_report_command = None
+    if args.idle_report_command:
+        try:
+            idle_report_command = bytes.fromhex(args.idle_report_command)
+        except ValueError:
+            raise ValueError(f"--idle-report-command: '{args.idle_report_command}' is not hex")
+    hotkey_engine = None
+    if args.hotkey:
+        hotkey_engine = HotkeyEngine([parse_hotkey(spec, HOTKEY_BUTTON_NAMES, HOTKEY_ACTIONS) for spec in args.hotkey])
+    host_bdaddr = None
+    if args.host_bdaddr:
+        try:
+            host_bdaddr = parse_bdaddr(args.host_bdaddr)
+        except argparse.ArgumentTypeError as e:
+            raise ValueError(f"--host-bdaddr: {e}")
+
+async def run_bridge(backend=None, **options):
+    """
+    Entry point for tools embedding the bridge: runs it in the caller's event loop until stop_bridge(), without
+    signal handlers, keyboard input on stdin or the per-report status line. options are the command line options
+    by their argparse names (output='none', dsu=26760, adapter=['hci0'], hotkey=['HOME+PLUS=exit'], ...),
+    backend stands in for bleak (see soak_bridge.py).
+    """
+    global interactive, keep_running, adapter_pool
+    args = build_parser().parse_args([])
+    unknown = set(options) - set(vars(args))
+    if unknown:
+        raise TypeError(f"unknown bridge options: {', '.join(sorted(unknown))}")
+    vars(args).update(options)
+    configure(args)
+    interactive = False
+    keep_running = True
+    adapter_pool = AdapterPool(adapter_names, backend) if backend else None
+    await main()
+
+def stop_bridge():
+    """The bridge disconnects its controllers and run_bridge() returns shortly after"""
+    global keep_running
+    keep_running = False
+
+if __name__ == "__main__":
+    parser = build_parser()
+    args = parser.parse_args()
+    try:
+        configure(args)
+    except ValueError as e:
+        parser.error(str(e))
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
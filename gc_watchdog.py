@@ -0,0 +1,112 @@
+"""
+Event loop watchdog: measures how late the loop wakes up a sleeping task (scheduling lag) and times every
+callback the loop runs, naming the ones over budget. Decoding, output and printing share the loop with
+every controller, so this shows whether the bridge itself is where input lag comes from.
+"""
+
+import asyncio
+import functools
+import time
+from asyncio import events
+
+# Upper bounds of the lag histogram buckets in seconds, the last bucket takes everything above
+LAG_BUCKETS = (0.001, 0.002, 0.005, 0.010, 0.020, 0.050, 0.100)
+
+def describe_callback(callback):
+    """Name of what a loop handle runs: the coroutine for task steps, the function otherwise"""
+    while isinstance(callback, functools.partial):
+        callback = callback.func
+    owner = getattr(callback, '__self__', None)
+    if isinstance(owner, asyncio.Task):
+        coro = owner.get_coro()
+        return f"task {getattr(coro, '__qualname__', owner.get_name())}"
+    if isinstance(owner, asyncio.Future):
+        return f"future callback {getattr(callback, '__qualname__', repr(callback))}"
+    return getattr(callback, '__qualname__', None) or repr(callback)
+
+class LoopWatchdog:
+    """
+    install() hooks the loop's callback dispatch, run() is the lag probe task.
+    Same timing asyncio's debug mode does for slow_callback_duration, without debug mode's per-callback traceback capture.
+    """
+
+    def __init__(self, budget=0.010, interval=0.005):
+        self.budget = budget
+        self.interval = interval
+        self.lag_counts = [0] * (len(LAG_BUCKETS) + 1)
+        self.lag_samples = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.callbacks = 0
+        # callback name -> [count, total seconds, max seconds]
+        self.slow_callbacks = {}
+        self.on_slow = None
+        self.original_run = None
+
+    def install(self):
+        if self.original_run:
+            return
+        original_run = self.original_run = events.Handle._run
+        watchdog = self
+
+        def timed_run(handle):
+            start = time.perf_counter()
+            try:
+                original_run(handle)
+            finally:
+                watchdog.callbacks += 1
+                elapsed = time.perf_counter() - start
+                if elapsed > watchdog.budget:
+                    watchdog.record_slow(handle, elapsed)
+
+        events.Handle._run = timed_run
+
+    def uninstall(self):
+        if self.original_run:
+            events.Handle._run = self.original_run
+            self.original_run = None
+
+    def record_slow(self, handle, elapsed):
+        name = describe_callback(handle._callback)
+        entry = self.slow_callbacks.get(name)
+        if entry is None:
+            entry = self.slow_callbacks[name] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+        if self.on_slow:
+            self.on_slow(name, elapsed)
+
+    async def run(self):
+        clock = time.perf_counter
+        interval = self.interval
+        while True:
+            start = clock()
+            await asyncio.sleep(interval)
+            lag = clock() - start - interval
+            if lag < 0:
+                lag = 0.0
+            self.lag_samples += 1
+            self.lag_total += lag
+            if lag > self.lag_max:
+                self.lag_max = lag
+            index = 0
+            while index < len(LAG_BUCKETS) and lag > LAG_BUCKETS[index]:
+                index += 1
+            self.lag_counts[index] += 1
+
+    def report(self):
+        lines = []
+        if self.lag_samples:
+            lines.append(f"Loop lag: mean {self.lag_total / self.lag_samples * 1000:.2f} ms, max {self.lag_max * 1000:.2f} ms over {self.lag_samples} samples")
+            lower = 0.0
+            for index, count in enumerate(self.lag_counts):
+                if count:
+                    upper = f"{LAG_BUCKETS[index] * 1000:g} ms" if index < len(LAG_BUCKETS) else "+"
+                    lines.append(f"   {lower * 1000:g}-{upper}: {count}")
+                lower = LAG_BUCKETS[index] if index < len(LAG_BUCKETS) else lower
+        slow_total = sum(entry[0] for entry in self.slow_callbacks.values())
+        lines.append(f"Callbacks over {self.budget * 1000:g} ms: {slow_total} of {self.callbacks}")
+        for name, (count, total, longest) in sorted(self.slow_callbacks.items(), key=lambda item: item[1][1], reverse=True):
+            lines.append(f"   {name}: {count}x, max {longest * 1000:.1f} ms, total {total * 1000:.1f} ms")
+        return lines
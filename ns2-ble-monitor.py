@@ -120,6 +120,7 @@ input_characteristic = None
 nintendo_device_info = {}
 current_state = ControllerState.READ_INFO
 last_raw_data = None
+last_inputs = None
 
 def handle_signal(signum, frame):
     global keep_running
@@ -226,11 +227,16 @@ def print_raw_bytes(data):
     return f"Raw: {raw_str}"
 
 async def notification_callback(sender, data):
-    global controller_state, last_raw_data
+    global controller_state, last_raw_data, last_inputs
     if not data or len(data) < 10:
         return
     last_raw_data = data
     pid = controller_state.get('product_id', PRODUCT_ID_PRO) if controller_state else PRODUCT_ID_PRO
+    # An untouched controller keeps sending the same buttons, sticks and triggers, nothing to redraw
+    inputs = data[4:16] + data[60:62] if pid == PRODUCT_ID_GC else data[4:16]
+    if inputs == last_inputs and not debug_mode:
+        return
+    last_inputs = inputs
     if len(data) >= 8:
         button_data = int.from_bytes(data[4:8], byteorder='little')
     else:
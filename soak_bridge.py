@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Soak test for gc_vgamepad.py: runs the real bridge loop for hours against simulated BLE controllers that
+stream reports, answer the init sequence, get rumble requests from a driver-like thread and drop out and
+come back now and then. Samples RSS, tracemalloc, live threads and live tasks and fails on unbounded growth.
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+import contextlib
+import tracemalloc
+
+import gc_vgamepad
+
+REPORT_INTERVAL = 0.008
+# Samples taken before this share of the run are warmup and don't count towards growth
+WARMUP_FRACTION = 0.2
+
+class SimulatedCharacteristic:
+    def __init__(self, uuid, properties):
+        self.uuid = uuid
+        self.properties = properties
+
+class SimulatedService:
+    def __init__(self, uuid, characteristics):
+        self.uuid = uuid
+        self.characteristics = characteristics
+
+SIMULATED_SERVICES = [SimulatedService(gc_vgamepad.NINTENDO_SERVICE_UUID, [
+    SimulatedCharacteristic("input", ["notify"]),
+    SimulatedCharacteristic("output", ["write-without-response"]),
+    SimulatedCharacteristic("reply", ["notify"]),
+])]
+
+class SimulatedDevice:
+    def __init__(self, index):
+        self.address = f"5A:00:00:00:00:{index:02X}"
+        self.name = "Nintendo GameCube Controller"
+        self.metadata = {}
+        self.connected = False
+        self.product_id = 0x7305
+
+class SimulatedAdvertisement:
+    def __init__(self, device):
+        self.local_name = device.name
+        # Nintendo manufacturer data with the advertised GameCube controller PID
+        self.manufacturer_data = {gc_vgamepad.NINTENDO_COMPANY_ID: bytes([0x01, 0x00, 0x03, 0x7E, 0x05, 0x73])}
+        self.rssi = -50
+
+class SimulatedScanner:
+    def __init__(self, devices, detection_callback):
+        self.devices = devices
+        self.detection_callback = detection_callback
+
+    async def __aenter__(self):
+        for device in self.devices:
+            if not device.connected:
+                self.detection_callback(device, SimulatedAdvertisement(device))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+class SimulatedClient:
+    """Streams reports while connected, drops the connection after a random lifetime"""
+
+    def __init__(self, device, lifetime):
+        self.device = device
+        self.lifetime = lifetime
+        self.is_connected = False
+        self.callbacks = {}
+        self.report_handle = None
+        self.counter = 0
+        self.writes = 0
+
+    async def connect(self):
+        await asyncio.sleep(0.05)
+        self.is_connected = self.device.connected = True
+        loop = asyncio.get_running_loop()
+        loop.call_later(self.lifetime, self.drop)
+        self.report_handle = loop.call_later(REPORT_INTERVAL, self.send_report)
+        return True
+
+    def drop(self):
+        self.is_connected = self.device.connected = False
+        if self.report_handle:
+            self.report_handle.cancel()
+            self.report_handle = None
+
+    async def disconnect(self):
+        self.drop()
+
+    async def get_services(self):
+        return SIMULATED_SERVICES
+
+    async def start_notify(self, uuid, callback):
+        self.callbacks[uuid] = callback
+
+    def deliver(self, uuid, data):
+        callback = self.callbacks.get(uuid)
+        if callback is None:
+            return
+        # Same as bleak: coroutine callbacks run as a task per notification
+        result = callback(uuid, data)
+        if asyncio.iscoroutine(result):
+            asyncio.ensure_future(result)
+
+    async def write_gatt_char(self, uuid, data, response=False):
+        if not self.is_connected:
+            raise ConnectionError("Not connected")
+        self.writes += 1
+        if len(data) >= 8 and data[1] == 0x91:
+            # Init commands get a reply echoing command, subcommand and the arguments, then some payload
+            reply = bytes([data[0], 0x01, 0x01, data[3], 0x00, 0x10, 0x00, 0x00]) + bytes(data[8:]) + bytes(range(0x40))
+            asyncio.get_running_loop().call_soon(self.deliver, "reply", reply)
+
+    def send_report(self):
+        if not self.is_connected:
+            return
+        self.counter += 1
+        report = bytearray(64)
+        report[0] = self.counter & 0xFF
+        # Buttons change now and then, sticks wander
+        report[4] = 0x08 if (self.counter // 50) % 2 else 0x00
+        value = 1998 + int(1000 * ((self.counter % 200) / 100 - 1))
+        report[10:13] = bytes([value & 0xFF, ((value >> 8) & 0xF) | ((value & 0xF) << 4), value >> 4])
+        report[60] = self.counter & 0xFF
+        self.deliver("input", bytes(report))
+        self.report_handle = asyncio.get_running_loop().call_later(REPORT_INTERVAL, self.send_report)
+
+class SimulatedBackend:
+    def __init__(self, count, mean_lifetime):
+        self.devices = [SimulatedDevice(index) for index in range(count)]
+        self.mean_lifetime = mean_lifetime
+        self.clients = 0
+
+    def scanner(self, detection_callback, adapter=None, **kwargs):
+        return SimulatedScanner(self.devices, detection_callback)
+
+    def client(self, device, adapter=None):
+        self.clients += 1
+        return SimulatedClient(device, random.uniform(0.5, 1.5) * self.mean_lifetime)
+
+def rumble_traffic(rate, stop_event):
+    """Plays the vgamepad driver thread, firing rumble notifications at connected controllers"""
+    while not stop_event.wait(1.0 / rate):
+        connected = gc_vgamepad.connected_controllers()
+        if connected:
+            gc_vgamepad.async_rumble_handler(random.choice(connected), random.randint(1, 255), random.randint(0, 255))
+
+def read_rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    # Peak rather than current off Linux, still catches steady growth
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def slope(samples, index):
+    """Least squares growth per second of column index over (time, ...) samples"""
+    count = len(samples)
+    if count < 2:
+        return 0.0
+    mean_t = sum(sample[0] for sample in samples) / count
+    mean_v = sum(sample[index] for sample in samples) / count
+    variance = sum((sample[0] - mean_t) ** 2 for sample in samples)
+    if not variance:
+        return 0.0
+    return sum((sample[0] - mean_t) * (sample[index] - mean_v) for sample in samples) / variance
+
+async def soak(args, log):
+    backend = SimulatedBackend(args.controllers, args.reconnect_interval)
+    # Simulated controllers stay out of the real pairing cache
+    gc_vgamepad.PAIRING_CACHE_FILE = os.path.join(args.cache_dir, "ns2_controllers.json")
+    bridge = asyncio.create_task(gc_vgamepad.run_bridge(backend=backend, output='none'))
+    stop_rumble = threading.Event()
+    rumble_thread = None
+    if args.rumble_rate > 0:
+        rumble_thread = threading.Thread(target=rumble_traffic, args=(args.rumble_rate, stop_rumble), name="rumble-traffic", daemon=True)
+        rumble_thread.start()
+
+    start = time.monotonic()
+    first_snapshot = None
+    # (seconds, RSS kB, traced kB, threads, tasks)
+    samples = []
+    while time.monotonic() - start < args.duration and not bridge.done():
+        await asyncio.sleep(args.sample_interval)
+        elapsed = time.monotonic() - start
+        traced_kb = tracemalloc.get_traced_memory()[0] // 1024 if tracemalloc.is_tracing() else 0
+        sample = (elapsed, read_rss_kb(), traced_kb, threading.active_count(), len(asyncio.all_tasks()))
+        samples.append(sample)
+        if first_snapshot is None and elapsed >= args.duration * WARMUP_FRACTION and tracemalloc.is_tracing():
+            first_snapshot = tracemalloc.take_snapshot()
+        log(f"[{elapsed:7.0f}s] RSS {sample[1] / 1024:7.1f} MB | traced {sample[2] / 1024:7.1f} MB | threads {sample[3]:3d} | tasks {sample[4]:4d} | "
+            f"connected {len(gc_vgamepad.connected_controllers())} | connections {backend.clients}")
+
+    stop_rumble.set()
+    gc_vgamepad.stop_bridge()
+    await bridge
+    if rumble_thread:
+        rumble_thread.join()
+
+    if first_snapshot is not None:
+        log("\nTop allocators since warmup:")
+        for stat in tracemalloc.take_snapshot().compare_to(first_snapshot, 'lineno')[:args.top]:
+            log(f"   {stat}")
+
+    steady = [sample for sample in samples if sample[0] >= args.duration * WARMUP_FRACTION]
+    hours = args.duration / 3600
+    failures = []
+    rss_growth = slope(steady, 1) * args.duration / 1024
+    traced_growth = slope(steady, 2) * args.duration / 1024
+    thread_growth = slope(steady, 3) * args.duration
+    task_growth = slope(steady, 4) * args.duration
+    log(f"\nGrowth over the run after warmup: RSS {rss_growth:+.1f} MB, traced {traced_growth:+.1f} MB, "
+        f"threads {thread_growth:+.1f}, tasks {task_growth:+.1f} ({hours:.2f} h, {backend.clients} connections)")
+    if rss_growth > args.max_memory_growth:
+        failures.append(f"RSS grew by {rss_growth:.1f} MB")
+    if tracemalloc.is_tracing() and traced_growth > args.max_memory_growth:
+        failures.append(f"traced memory grew by {traced_growth:.1f} MB")
+    if thread_growth > args.max_thread_growth:
+        failures.append(f"thread count grew by {thread_growth:.1f}")
+    if task_growth > args.max_task_growth:
+        failures.append(f"task count grew by {task_growth:.1f}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description='Soak test gc_vgamepad.py against simulated controllers')
+    parser.add_argument('--duration', type=float, default=4 * 3600, help='Seconds to run (default: 4 hours)')
+    parser.add_argument('--controllers', type=int, default=4, help='Simulated controllers (default: 4)')
+    parser.add_argument('--reconnect-interval', type=float, default=60.0, help='Mean seconds a controller stays connected (default: 60)')
+    parser.add_argument('--rumble-rate', type=float, default=20.0, help='Rumble requests per second from the driver thread (default: 20)')
+    parser.add_argument('--sample-interval', type=float, default=30.0, help='Seconds between samples (default: 30)')
+    parser.add_argument('--max-memory-growth', type=float, default=10.0, help='Allowed RSS/traced memory growth in MB (default: 10)')
+    parser.add_argument('--max-thread-growth', type=float, default=1.0, help='Allowed growth of the live thread count (default: 1)')
+    parser.add_argument('--max-task-growth', type=float, default=4.0, help='Allowed growth of the live task count (default: 4)')
+    parser.add_argument('--no-tracemalloc', action='store_true', help='Skip tracemalloc, it slows the bridge down noticeably')
+    parser.add_argument('--top', type=int, default=10, help='Top allocators to list (default: 10)')
+    args = parser.parse_args()
+
+    out = sys.stdout
+    def log(message):
+        print(message, file=out, flush=True)
+
+    if not args.no_tracemalloc:
+        tracemalloc.start()
+    # The bridge's own console output goes nowhere, the soak log stays readable
+    with tempfile.TemporaryDirectory() as args.cache_dir, open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        failures = asyncio.run(soak(args, log))
+    for failure in failures:
+        log(f"❌ {failure}")
+    if not failures:
+        log("✅ No unbounded growth")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())